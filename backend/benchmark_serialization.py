@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for /api/referent/users and /api/rankings.
+
+Compares the validated path (User(**doc) for every document, then FastAPI
+re-validating against response_model) with the trusted-document fast path,
+on 10k members, both for the serialization step alone and end-to-end
+through the ASGI app. MongoDB is replaced by an in-memory collection so the
+numbers only reflect the response path.
+
+    cd backend && python benchmark_serialization.py [--documents 10000] [--rounds 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ["PAGE_SIZE_MAX"] = "100000"
+
+import server  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, count):
+        return MemoryCursor(self.docs[count:])
+
+    def limit(self, count):
+        return MemoryCursor(self.docs[:count])
+
+    async def to_list(self, length):
+        return [dict(doc) for doc in self.docs[:length]]
+
+
+class MemoryCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, *args, **kwargs):
+        return MemoryCursor(self.docs)
+
+
+def make_members(count):
+    return [{
+        "id": f"user-{i:06d}",
+        "email": f"membre{i}@example.com",
+        "nom": f"Nom{i}",
+        "prenom": f"Prénom{i}",
+        "type_licence": "competition" if i % 2 else "jeu_libre",
+        "est_licencie": True,
+        "role": "user",
+        "points": (i * 37) % 5000,
+        "participations": i % 60,
+        "date_creation": f"2025-01-01T00:00:{i % 60:02d}+00:00",
+    } for i in range(count)]
+
+
+def route_field(path):
+    return next(route for route in server.app.routes if getattr(route, "path", None) == path).response_field
+
+
+async def validated(field, docs):
+    content = await serialize_response(field=field, response_content=[server.User(**doc) for doc in docs])
+    return JSONResponse(content).body
+
+
+def fast(docs):
+    return server.fast_json_response(server.project_user, docs).body
+
+
+async def call_asgi(path, token):
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": path, "raw_path": path.encode(),
+             "query_string": query.encode(), "headers": headers, "scheme": "http", "server": ("bench", 80),
+             "client": ("bench", 1), "root_path": ""}
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await server.app(scope, receive, send)
+    return b"".join(body)
+
+
+def report(name, seconds, rounds, documents):
+    per_call = seconds / rounds
+    print(f"  {name:<28} {per_call * 1000:8.2f} ms/request  {documents / per_call:12,.0f} documents/s")
+    return per_call
+
+
+async def main(documents, rounds):
+    members = make_members(documents)
+    server.db = {"users": MemoryCollection(members)}
+    server.leaderboard.rebuild(members)
+    ranked = server.leaderboard.top(documents)
+    token = server.create_user_tokens({"id": "bench", "role": "referent", "est_licencie": True})["token"]
+
+    print(f"orjson: {'yes' if server.orjson is not None else 'no (standard json)'}; {documents} documents, {rounds} rounds")
+    for path, docs in (("/api/referent/users", members), ("/api/rankings", ranked)):
+        field = route_field(path)
+        assert json.loads(await validated(field, docs)) == json.loads(fast(docs))
+        print(path)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await validated(field, docs)
+        slow = report("validated serialization", time.perf_counter() - start, rounds, documents)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fast(docs)
+        quick = report("fast serialization", time.perf_counter() - start, rounds, documents)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await call_asgi(f"{path}?limit={documents}", token)
+        report("end-to-end (fast path)", time.perf_counter() - start, rounds, documents)
+        print(f"  speed-up on serialization: x{slow / quick:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.rounds))
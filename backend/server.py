@@ -1,18 +1,63 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, Query, Request, Response, UploadFile, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
 import os
 import logging
+import base64
+import contextlib
+import contextvars
+import copy
+import csv
+import hashlib
+import io
+import json
+import zlib
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 import jwt
 import asyncio
+import itertools
+import random
+import re
+import secrets
+import smtplib
+import socket
+import struct
+import tempfile
+import time
+import weakref
 import resend
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, parsedate_to_datetime
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: the shared read model needs a POSIX host
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: gzip is served instead
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: the standard encoder is used instead
+    orjson = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -35,35 +80,161 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)
 
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'votre-cle-secrete-super-securisee-changez-moi')
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://192.168.1.27:3000')  # URL pour accès réseau
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 43200
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
+REFRESH_TOKEN_EXPIRE_MINUTES = 43200
+RESET_TOKEN_EXPIRE_MINUTES = 43200
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '256'))
+
+# Consecutive connection failures before MongoDB calls fail fast, and ping interval while they do
+MONGO_BREAKER_FAILURES = int(os.environ.get('MONGO_BREAKER_FAILURES', '3'))
+MONGO_BREAKER_PROBE_SECONDS = float(os.environ.get('MONGO_BREAKER_PROBE_SECONDS', '2'))
+
+# Writes received while MongoDB is down are journaled here and replayed once it is back
+WRITE_JOURNAL_PATH = os.environ.get('WRITE_JOURNAL_PATH', str(ROOT_DIR / 'journal' / f"{os.environ.get('DB_NAME', 'default')}.jsonl"))
+WRITE_JOURNAL_FLUSH_SECONDS = float(os.environ.get('WRITE_JOURNAL_FLUSH_SECONDS', '0.005'))
+WRITE_JOURNAL_MAX_BODY_BYTES = 1024 * 1024
+# Beyond this size writes are refused with 503 rather than filling the disk
+WRITE_JOURNAL_MAX_BYTES = int(os.environ.get('WRITE_JOURNAL_MAX_MB', '256')) * 1024 * 1024
+JOURNALED_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Authentication answers with tokens and /batch only reads: neither can be deferred
+JOURNAL_EXCLUDED_PREFIXES = ("/api/auth/", "/api/batch")
+
+TASK_CONCURRENCY = int(os.environ.get('TASK_CONCURRENCY', '8'))
+TASK_QUEUE_SIZE = int(os.environ.get('TASK_QUEUE_SIZE', '1000'))
+TASK_DRAIN_SECONDS = float(os.environ.get('TASK_DRAIN_SECONDS', '10'))
+
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '10000'))
+# Distinct matches buffered per subscriber; older ones are dropped first
+SSE_QUEUE_SIZE = 256
+
+# Cross-worker cache invalidation: "none" (single worker), "local" (Unix sockets, one host) or "mongo" (change streams)
+INVALIDATION_BUS = os.environ.get('INVALIDATION_BUS', 'none')
+INVALIDATION_SOCKET_DIR = os.environ.get('INVALIDATION_SOCKET_DIR', f"/tmp/tcs-invalidation-{os.environ.get('DB_NAME', 'default')}")
+
+# Rankings, achievements and training schedule shared by the workers of a host (POSIX only)
+READ_MODEL = os.environ.get('READ_MODEL', '0') == '1' and fcntl is not None
+READ_MODEL_SIZE_MB = int(os.environ.get('READ_MODEL_SIZE_MB', '32'))
+READ_MODEL_READ_RETRIES = 100
+READ_MODEL_TAKEOVER_SECONDS = 5
+
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '500'))
+
+LEADERBOARD_RECONCILE_SECONDS = int(os.environ.get('LEADERBOARD_RECONCILE_SECONDS', '300'))
+LEADERBOARD_REFRESH_DELAY = float(os.environ.get('LEADERBOARD_REFRESH_DELAY', '5'))
+
+DASHBOARD_MATCHES = 5
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+BATCH_SUBREQUEST_TIMEOUT = float(os.environ.get('BATCH_SUBREQUEST_TIMEOUT', '10'))
+# Live streams and exports never complete as one buffered response
+BATCH_STREAMING_PATHS = re.compile(r"^/(referent/export/.*|(matches|tournaments)(/[^/]+)?/live)/?$")
+
+BULK_MAX_OPERATIONS = int(os.environ.get('BULK_MAX_OPERATIONS', '1000'))
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+EXPORT_FLUSH_ROWS = 100
+USER_EXPORT_COLUMNS = ["id", "email", "nom", "prenom", "type_licence", "est_licencie", "role", "points", "participations", "date_creation"]
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+LICENCE_TYPES = ["competition", "jeu_libre"]
+
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '30'))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+
+# Seconds a public read stays fresh, per collection; referent writes invalidate earlier
+DOMAIN_CACHE_TTLS = {
+    "achievements": float(os.environ.get('CACHE_TTL_ACHIEVEMENTS', '3600')),
+    "training_schedule": float(os.environ.get('CACHE_TTL_TRAINING_SCHEDULE', '600')),
+    "tournaments": float(os.environ.get('CACHE_TTL_TOURNAMENTS', '60')),
+    "matches": float(os.environ.get('CACHE_TTL_MATCHES', '30')),
+    "news": float(os.environ.get('CACHE_TTL_NEWS', '120')),
+}
+DOMAIN_CACHE_STALE_SECONDS = float(os.environ.get('DOMAIN_CACHE_STALE_SECONDS', '60'))
+DOMAIN_CACHE_SIZE = int(os.environ.get('DOMAIN_CACHE_SIZE', '256'))
+# Cached payloads smaller than this are not worth a compressed variant
+COMPRESS_MIN_BYTES = 512
 
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 ADMIN_EMAIL = os.environ.get('ADMIN_NOTIFICATION_EMAIL', 'thiago.gomes97300@gmail.com')
 REFERENT_SECRET_CODE = f"TCS-REF-{datetime.now(timezone.utc).year}"
 
+SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_EMAIL = os.environ.get('SMTP_EMAIL', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+if SMTP_PASSWORD == 'sua_app_password_aqui':
+    SMTP_PASSWORD = ''
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '1') == '1'
+# SMTP_AUTH=none sends without logging in (local relay or test server); otherwise a password is required
+SMTP_AUTH = os.environ.get('SMTP_AUTH', 'login')
+SMTP_ENABLED = bool(SMTP_EMAIL) and (SMTP_AUTH == 'none' or bool(SMTP_PASSWORD))
+SMTP_IDLE_SECONDS = float(os.environ.get('SMTP_IDLE_SECONDS', '60'))
+
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', '2'))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '8'))
+EMAIL_BACKOFF_BASE_SECONDS = 5.0
+EMAIL_BACKOFF_MAX_SECONDS = 3600.0
+EMAIL_LEASE_SECONDS = 120.0
+EMAIL_POLL_SECONDS = 30.0
+EMAIL_BREAKER_FAILURES = 5
+EMAIL_BREAKER_RESET_SECONDS = 60.0
+# Sent and abandoned messages are kept this long, without their body, then expire
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', '30'))
+
 if RESEND_API_KEY:
     resend.api_key = RESEND_API_KEY
 
 logger = logging.getLogger(__name__)
 
-# Fallback in-memory data store when MongoDB is unavailable
-FALLBACK_DATA = {
-    "training_schedule": [],
-    "users": [],
-    "tournaments": [],
-    "matches": [],
-    "news": [],
-    "achievements": []
-}
+# Reference data owned by the code: applied to the database by MIGRATIONS
+ACHIEVEMENTS_CATALOG = [
+    {
+        "id": "membre_fidele",
+        "nom": "Membre Fidèle",
+        "description": "Participer à 10 événements du club",
+        "icone": "🏐",
+        "points": 100
+    },
+    {
+        "id": "toujours_present",
+        "nom": "Toujours Présent",
+        "description": "Participer à 20 événements du club",
+        "icone": "⭐",
+        "points": 250
+    },
+    {
+        "id": "veteran",
+        "nom": "Vétéran",
+        "description": "Participer à 50 événements du club",
+        "icone": "👑",
+        "points": 500
+    },
+    {
+        "id": "premier_tournoi",
+        "nom": "Premier Tournoi",
+        "description": "S'inscrire à son premier tournoi",
+        "icone": "🎯",
+        "points": 50
+    },
+    {
+        "id": "champion",
+        "nom": "Champion du Club",
+        "description": "Gagner 3 tournois",
+        "icone": "🏆",
+        "points": 1000
+    }
+]
 
-# Initialize training schedules in fallback
-FALLBACK_DATA["training_schedule"] = [
+DEFAULT_TRAINING_SCHEDULE = [
     {
         "id": "lundi_entrainement",
         "jour": "Lundi",
@@ -96,7 +267,7 @@ FALLBACK_DATA["training_schedule"] = [
         "jour": "Mercredi",
         "heure_debut": "20:00",
         "heure_fin": "22:00",
-        "type": "Jeu Livre",
+        "type": "Jeu Libre",
         "licence_requise": "tous",
         "description": "Jeu libre ouvert à tous les licenciés"
     },
@@ -105,12 +276,966 @@ FALLBACK_DATA["training_schedule"] = [
         "jour": "Vendredi",
         "heure_debut": "18:00",
         "heure_fin": "22:00",
-        "type": "Jeu Livre",
+        "type": "Jeu Libre",
         "licence_requise": "tous",
-        "description": "Jeu libre ouvert à todos os licenciés"
+        "description": "Jeu libre ouvert à tous les licenciés"
     }
 ]
 
+# Fallback in-memory data store when MongoDB is unavailable
+FALLBACK_DATA = {
+    "training_schedule": [],
+    "users": [],
+    "tournaments": [],
+    "matches": [],
+    "news": [],
+    "achievements": []
+}
+
+# Initialize training schedules in fallback
+FALLBACK_DATA["training_schedule"] = copy.deepcopy(DEFAULT_TRAINING_SCHEDULE)
+
+# Password hashing priorities: lower value is served first
+PRIORITY_LOGIN = 0
+PRIORITY_REGISTER = 1
+
+def _hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_password_sync(password: str, password_hash: str) -> bool:
+    return pwd_context.verify(password, password_hash)
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool, off the event loop.
+
+    Jobs wait in a bounded priority queue so a burst of registrations
+    cannot delay logins, and a full queue is rejected with a 503.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self._executor = None
+        self._queue = None
+        self._dispatchers = []
+        self._sequence = itertools.count()
+        self._metrics = {
+            priority: {"jobs": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+            for priority in (PRIORITY_LOGIN, PRIORITY_REGISTER)
+        }
+        self._rejected = 0
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = asyncio.PriorityQueue()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, enqueued_at, func, args, future = await self._queue.get()
+            waited = time.monotonic() - enqueued_at
+            metrics = self._metrics[priority]
+            metrics["jobs"] += 1
+            metrics["queue_time_total"] += waited
+            metrics["queue_time_max"] = max(metrics["queue_time_max"], waited)
+            if future.cancelled():
+                continue
+            try:
+                result = await loop.run_in_executor(self._executor, func, *args)
+            except BrokenProcessPool as e:
+                logger.error(f"Password hashing pool crashed, restarting it: {e}")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                if not future.done():
+                    future.set_exception(e)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _submit(self, priority: int, func, *args):
+        self.start()
+        if self._queue.qsize() >= self.queue_size:
+            self._rejected += 1
+            raise HTTPException(status_code=503, detail="Service surchargé, veuillez réessayer")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), time.monotonic(), func, args, future))
+        return await future
+
+    async def hash(self, password: str, priority: int = PRIORITY_REGISTER) -> str:
+        return await self._submit(priority, _hash_password_sync, password)
+
+    async def hash_many(self, passwords: List[str], priority: int = PRIORITY_REGISTER) -> List[str]:
+        """Hash a bulk of passwords with at most ``workers`` of them queued at a time.
+
+        A bulk job larger than the queue would otherwise be rejected halfway;
+        this way it never takes the room interactive requests need.
+        """
+        slots = asyncio.Semaphore(self.workers)
+
+        async def hash_one(password: str) -> str:
+            async with slots:
+                return await self.hash(password, priority)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    async def verify(self, password: str, password_hash: str, priority: int = PRIORITY_LOGIN) -> bool:
+        return await self._submit(priority, _verify_password_sync, password, password_hash)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "executor": type(self._executor).__name__ if self._executor else None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "rejected": self._rejected,
+            "queue_time": {
+                "login" if priority == PRIORITY_LOGIN else "register": {
+                    "jobs": m["jobs"],
+                    "avg_ms": round(1000 * m["queue_time_total"] / m["jobs"], 2) if m["jobs"] else 0.0,
+                    "max_ms": round(1000 * m["queue_time_max"], 2),
+                }
+                for priority, m in self._metrics.items()
+            },
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+class TaskSupervisor:
+    """Runs background jobs on a fixed number of workers fed by a bounded queue.
+
+    ``submit`` waits for room in the queue (backpressure on the caller);
+    ``submit_nowait`` is for synchronous callers and drops the job when the
+    queue is full. A ``key`` coalesces a job with an identical one that is
+    still queued or running. On shutdown ``drain`` lets queued jobs finish
+    until a deadline, then cancels what is left.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self._queue = None
+        self._workers = []
+        self._keys = set()
+        self._accepting = True
+        self._metrics = {}
+        self._rejected = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(self.queue_size)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    def _job(self, name: str, func, args, key):
+        metrics = self._metrics.setdefault(name, {
+            "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "coalesced": 0,
+            "run_time_total": 0.0, "run_time_max": 0.0, "queue_time_total": 0.0,
+        })
+        if key is not None and key in self._keys:
+            metrics["coalesced"] += 1
+            return None
+        metrics["submitted"] += 1
+        return (name, func, args, key, time.monotonic())
+
+    async def submit(self, name: str, func, *args, key: Optional[str] = None) -> bool:
+        if not self._accepting:
+            self._rejected += 1
+            return False
+        self.start()
+        job = self._job(name, func, args, key)
+        if job is None:
+            return True
+        if key is not None:
+            self._keys.add(key)
+        await self._queue.put(job)
+        return True
+
+    def submit_nowait(self, name: str, func, *args, key: Optional[str] = None) -> bool:
+        if not self._accepting:
+            self._rejected += 1
+            return False
+        try:
+            self.start()
+        except RuntimeError:
+            # No running event loop (import time, scripts): nothing to schedule on
+            return False
+        job = self._job(name, func, args, key)
+        if job is None:
+            return True
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            self._metrics[name]["submitted"] -= 1
+            logger.warning(f"Background queue full, job {name} dropped")
+            return False
+        if key is not None:
+            self._keys.add(key)
+        return True
+
+    async def _work(self):
+        while True:
+            name, func, args, key, enqueued_at = await self._queue.get()
+            metrics = self._metrics[name]
+            started = time.monotonic()
+            metrics["queue_time_total"] += started - enqueued_at
+            try:
+                await func(*args)
+            except asyncio.CancelledError:
+                metrics["cancelled"] += 1
+                raise
+            except Exception as e:
+                metrics["failed"] += 1
+                logger.error(f"Background job {name} failed: {e}")
+            else:
+                metrics["completed"] += 1
+            finally:
+                elapsed = time.monotonic() - started
+                metrics["run_time_total"] += elapsed
+                metrics["run_time_max"] = max(metrics["run_time_max"], elapsed)
+                self._keys.discard(key)
+                self._queue.task_done()
+
+    async def drain(self, deadline: float):
+        """Stop accepting jobs, give queued and running ones ``deadline`` seconds, cancel the rest"""
+        self._accepting = False
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), deadline)
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutdown deadline reached with {self._queue.qsize()} background jobs still queued")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "rejected": self._rejected,
+            "jobs": {
+                name: {
+                    "submitted": m["submitted"],
+                    "completed": m["completed"],
+                    "failed": m["failed"],
+                    "cancelled": m["cancelled"],
+                    "coalesced": m["coalesced"],
+                    "avg_run_ms": round(1000 * m["run_time_total"] / done, 2) if (done := m["completed"] + m["failed"]) else 0.0,
+                    "max_run_ms": round(1000 * m["run_time_max"], 2),
+                    "avg_queue_ms": round(1000 * m["queue_time_total"] / done, 2) if done else 0.0,
+                }
+                for name, m in self._metrics.items()
+            },
+        }
+
+task_supervisor = TaskSupervisor(TASK_CONCURRENCY, TASK_QUEUE_SIZE)
+
+class Subscription:
+    """Pending events of one stream consumer, keyed by the object they describe.
+
+    A newer event for the same key replaces the pending one, so a slow
+    consumer only receives the latest state; at most ``maxsize`` keys are
+    buffered, the oldest being dropped first.
+    """
+
+    __slots__ = ("topics", "maxsize", "pending", "ready", "coalesced", "dropped", "closed")
+
+    def __init__(self, topics: List[str], maxsize: int):
+        self.topics = topics
+        self.closed = False
+        self.maxsize = maxsize
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+
+    def push(self, key, frame: bytes):
+        if key in self.pending:
+            self.coalesced += 1
+            self.pending.move_to_end(key)
+        elif len(self.pending) >= self.maxsize:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = frame
+        self.ready.set()
+
+    def take(self) -> List[bytes]:
+        frames = list(self.pending.values())
+        self.pending.clear()
+        self.ready.clear()
+        return frames
+
+class EventHub:
+    """In-process publish/subscribe for Server-Sent Events.
+
+    Events are encoded once per publish and fanned out to the subscribers of
+    each topic without awaiting them, so publishing never blocks on a slow
+    spectator.
+    """
+
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._topics = {}
+        self._subscribers = 0
+        self._sequence = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        # Counters of subscriptions that already ended
+        self._coalesced = 0
+        self._dropped = 0
+
+    def subscribe(self, topics: List[str]) -> Subscription:
+        if self._subscribers >= self.max_subscribers:
+            raise HTTPException(status_code=503, detail="Trop de spectateurs connectés, veuillez réessayer")
+        subscription = Subscription(topics, self.queue_size)
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.closed:
+            return
+        subscription.closed = True
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+        self._subscribers -= 1
+        self._coalesced += subscription.coalesced
+        self._dropped += subscription.dropped
+
+    def publish(self, topics: List[str], event: str, key, data) -> int:
+        sequence = next(self._sequence)
+        frame = f"id: {sequence}\nevent: {event}\ndata: ".encode() + dumps_json(data) + b"\n\n"
+        targets = set()
+        for topic in topics:
+            targets.update(self._topics.get(topic, ()))
+        for subscription in targets:
+            subscription.push(key, frame)
+        self.published += 1
+        self.delivered += len(targets)
+        return len(targets)
+
+    def stats(self) -> dict:
+        subscriptions = {subscription for subscribers in self._topics.values() for subscription in subscribers}
+        return {
+            "subscribers": self._subscribers,
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self._coalesced + sum(subscription.coalesced for subscription in subscriptions),
+            "dropped": self._dropped + sum(subscription.dropped for subscription in subscriptions),
+        }
+
+event_hub = EventHub(SSE_MAX_SUBSCRIBERS, SSE_QUEUE_SIZE)
+
+async def sse_stream(subscription: Subscription, snapshot: Optional[bytes] = None):
+    """Yield SSE frames for a subscription, with a comment line as heartbeat when idle"""
+    try:
+        yield b"retry: 5000\n\n"
+        if snapshot is not None:
+            yield snapshot
+        while True:
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            for frame in subscription.take():
+                yield frame
+    finally:
+        event_hub.unsubscribe(subscription)
+
+def sse_response(subscription: Subscription, snapshot: Optional[bytes] = None) -> StreamingResponse:
+    stream = sse_stream(subscription, snapshot)
+    # The generator's finally only runs once iteration has started: a client
+    # gone before the first frame would otherwise keep its subscription
+    weakref.finalize(stream, event_hub.unsubscribe, subscription)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    Every key carries a generation that ``invalidate`` bumps, so a value
+    read from the database before an invalidation is never stored after it.
+    Generations come from one counter and only the ``maxsize`` most recent
+    are kept; a forgotten key reports the highest generation dropped, which
+    can only refuse a store, never accept a stale one.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = OrderedDict()
+        self._clock = itertools.count(1)
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            # Kept until evicted or invalidated: snapshot() may still need it
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def snapshot(self, key, default=None):
+        """Last value stored for ``key``, expired or not, unless invalidated since"""
+        entry = self._data.get(key)
+        return entry[1] if entry is not None else default
+
+    def generation(self, key) -> int:
+        return self._generations.get(key, self._forgotten)
+
+    def set(self, key, value, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation(key):
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+        self._generations[key] = next(self._clock)
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.maxsize:
+            _, dropped = self._generations.popitem(last=False)
+            self._forgotten = max(self._forgotten, dropped)
+
+    def clear(self):
+        for key in list(self._data):
+            self.invalidate(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Principals are cached without their password hash; a deleted user is cached as _USER_NOT_FOUND
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+_USER_NOT_FOUND = object()
+
+class DomainCache:
+    """Read-through cache for public reference data, one namespace per collection.
+
+    An entry is fresh for the collection TTL, then served stale for
+    ``stale_for`` more seconds while a single background load replaces it.
+    Concurrent misses on the same key share one database query. Writers call
+    ``invalidate(collection)``; a load started before the invalidation never
+    stores its result. Cached values are shared and must not be mutated.
+
+    The last value loaded for each key is also kept as a snapshot that
+    invalidations do not clear: when the database is unreachable, a miss is
+    answered from it and the response is marked stale.
+    """
+
+    def __init__(self, ttls: dict, stale_for: float, maxsize: int):
+        self.ttls = ttls
+        self.stale_for = stale_for
+        self.maxsize = maxsize
+        self._entries = {collection: OrderedDict() for collection in ttls}
+        self._snapshots = {collection: OrderedDict() for collection in ttls}
+        self._generations = dict.fromkeys(ttls, 0)
+        self._inflight = {}
+        self._counters = {
+            collection: {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "invalidations": 0, "snapshot_hits": 0}
+            for collection in ttls
+        }
+
+    async def get_or_load(self, collection: str, key, loader):
+        entries = self._entries[collection]
+        counters = self._counters[collection]
+        entry = entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            now = time.monotonic()
+            if now < expires_at:
+                entries.move_to_end(key)
+                counters["hits"] += 1
+                return value
+            if now < expires_at + self.stale_for:
+                counters["stale_hits"] += 1
+                if (collection, key) not in self._inflight:
+                    self._start_load(collection, key, loader)
+                return value
+        counters["misses"] += 1
+        load = self._inflight.get((collection, key)) or self._start_load(collection, key, loader)
+        try:
+            # Shielded so a cancelled request does not abort the load other callers wait on
+            return await asyncio.shield(load)
+        except ConnectionFailure:
+            snapshot = self._snapshots[collection].get(key)
+            if snapshot is None:
+                raise
+            counters["snapshot_hits"] += 1
+            loaded_at, value = snapshot
+            mark_stale(loaded_at)
+            return value
+
+    def _start_load(self, collection: str, key, loader) -> asyncio.Task:
+        inflight_key = (collection, key)
+        load = asyncio.ensure_future(self._load(collection, key, loader, self._generations[collection]))
+        self._inflight[inflight_key] = load
+
+        def done(task: asyncio.Task):
+            if self._inflight.get(inflight_key) is task:
+                del self._inflight[inflight_key]
+            if not task.cancelled() and task.exception() is not None and not isinstance(task.exception(), DatabaseUnavailable):
+                logger.warning(f"Cache load failed for {collection}: {task.exception()}")
+
+        load.add_done_callback(done)
+        return load
+
+    async def _load(self, collection: str, key, loader, generation: int):
+        value = await loader()
+        self._counters[collection]["loads"] += 1
+        if generation == self._generations[collection]:
+            entries = self._entries[collection]
+            entries[key] = (time.monotonic() + self.ttls[collection], value)
+            entries.move_to_end(key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        snapshots = self._snapshots[collection]
+        snapshots[key] = (time.time(), value)
+        snapshots.move_to_end(key)
+        while len(snapshots) > self.maxsize:
+            snapshots.popitem(last=False)
+        return value
+
+    def version(self, collection: str) -> int:
+        """Counter bumped by every invalidation of a collection"""
+        return self._generations[collection]
+
+    def invalidate(self, *collections: str):
+        for collection in collections:
+            if collection not in self._entries:
+                continue
+            self._entries[collection].clear()
+            self._generations[collection] += 1
+            self._counters[collection]["invalidations"] += 1
+            for inflight_key in [k for k in self._inflight if k[0] == collection]:
+                del self._inflight[inflight_key]
+
+    def stats(self) -> dict:
+        report = {}
+        for collection, counters in self._counters.items():
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+            report[collection] = {
+                "size": len(self._entries[collection]),
+                "ttl": self.ttls[collection],
+                **counters,
+                "hit_ratio": round((counters["hits"] + counters["stale_hits"]) / lookups, 3) if lookups else 0.0,
+            }
+        return report
+
+domain_cache = DomainCache(DOMAIN_CACHE_TTLS, DOMAIN_CACHE_STALE_SECONDS, DOMAIN_CACHE_SIZE)
+
+# Case-insensitive email comparison, for accounts created before emails were lowercased
+EMAIL_COLLATION = {"locale": "en", "strength": 2}
+
+# Every query the API issues must be served by one of these indexes: (collection, keys, options)
+INDEXES = [
+    ("users", [("id", 1)], {"name": "users_id", "unique": True}),
+    ("users", [("email", 1)], {"name": "users_email", "unique": True}),
+    ("users", [("email", 1)], {"name": "users_email_ci", "collation": EMAIL_COLLATION}),
+    ("users", [("est_licencie", 1), ("points", -1)], {"name": "users_ranking"}),
+    ("users", [("role", 1)], {"name": "users_role"}),
+    ("users", [("date_creation", 1), ("id", 1)], {"name": "users_date_creation_id"}),
+    ("user_achievements", [("user_id", 1), ("achievement_id", 1)], {"name": "user_achievements_user_achievement", "unique": True}),
+    ("achievements", [("id", 1)], {"name": "achievements_id", "unique": True}),
+    ("tournaments", [("id", 1)], {"name": "tournaments_id", "unique": True}),
+    ("tournaments", [("date_debut", -1), ("id", -1)], {"name": "tournaments_date_debut_id"}),
+    ("matches", [("id", 1)], {"name": "matches_id", "unique": True}),
+    ("matches", [("date", 1), ("id", 1)], {"name": "matches_date_id"}),
+    ("matches", [("tournament_id", 1), ("date", 1)], {"name": "matches_tournament_date"}),
+    ("news", [("id", 1)], {"name": "news_id", "unique": True}),
+    ("news", [("date_publication", -1), ("id", -1)], {"name": "news_date_publication_id"}),
+    ("training_schedule", [("id", 1)], {"name": "training_schedule_id", "unique": True}),
+    ("pending_referents", [("email", 1)], {"name": "pending_referents_email"}),
+    ("points_events", [("date", 1)], {"name": "points_events_date"}),
+    ("leaderboards", [("period", 1), ("board", 1), ("rang", 1), ("user_id", 1)], {"name": "leaderboards_period_board_rang"}),
+    ("cache_events", [("created_at", 1)], {"name": "cache_events_ttl", "expireAfterSeconds": 3600}),
+    ("email_outbox", [("id", 1)], {"name": "email_outbox_id", "unique": True}),
+    ("email_outbox", [("status", 1), ("next_attempt_at", 1)], {"name": "email_outbox_status_next_attempt"}),
+    ("email_outbox", [("finished_at", 1)], {"name": "email_outbox_finished_ttl", "expireAfterSeconds": EMAIL_OUTBOX_RETENTION_DAYS * 86400}),
+    ("journal_entries", [("id", 1)], {"name": "journal_entries_id", "unique": True}),
+    ("journal_entries", [("status", 1), ("at", -1)], {"name": "journal_entries_status_at"}),
+]
+
+index_report = {"created": [], "missing": [], "extra": []}
+
+async def ensure_indexes() -> dict:
+    """Create the registry indexes that are missing and report the ones nobody declared"""
+    report = {"created": [], "missing": [], "extra": []}
+    collections = {}
+    for collection, keys, options in INDEXES:
+        collections.setdefault(collection, []).append((keys, options))
+    
+    for collection, declared in collections.items():
+        existing = await db[collection].index_information()
+        existing_keys = {name: [tuple(k) for k in info["key"]] for name, info in existing.items()}
+        for keys, options in declared:
+            # Indexes differing only by collation or uniqueness share their keys: an unnamed match
+            # must carry the same options, or users_email_ci would stand in for users_email
+            if options["name"] in existing or ("collation" not in options and any(
+                existing_keys[name] == keys and "collation" not in info
+                and info.get("unique", False) == options.get("unique", False)
+                for name, info in existing.items()
+            )):
+                continue
+            try:
+                await db[collection].create_index(keys, **options)
+                report["created"].append(f"{collection}.{options['name']}")
+            except (DuplicateKeyError, OperationFailure) as e:
+                # A unique index cannot be built while duplicates exist: keep serving and report it
+                logger.error(f"Index {collection}.{options['name']} could not be created: {e}")
+                report["missing"].append(f"{collection}.{options['name']}")
+        declared_keys = [keys for keys, _ in declared]
+        for name, keys in existing_keys.items():
+            if name != "_id_" and keys not in declared_keys:
+                report["extra"].append(f"{collection}.{name}")
+    
+    if report["created"]:
+        logger.info(f"Indexes created: {', '.join(report['created'])}")
+    if report["missing"]:
+        logger.warning(f"Indexes missing: {', '.join(report['missing'])}")
+    if report["extra"]:
+        logger.warning(f"Indexes not declared in INDEXES: {', '.join(report['extra'])}")
+    index_report.update(report)
+    return report
+
+async def migrate_achievements_catalog():
+    # The catalog belongs to the code: existing entries are brought up to date
+    await db.achievements.bulk_write([
+        UpdateOne({"id": achievement["id"]}, {"$set": achievement}, upsert=True)
+        for achievement in ACHIEVEMENTS_CATALOG
+    ])
+
+async def migrate_default_training_schedule():
+    # Referents edit the schedule, deletions included: the defaults only seed an empty collection
+    if await db.training_schedule.count_documents({}) > 0:
+        return
+    await db.training_schedule.bulk_write([
+        UpdateOne({"id": training["id"]}, {"$setOnInsert": training}, upsert=True)
+        for training in DEFAULT_TRAINING_SCHEDULE
+    ])
+
+async def migrate_jeu_livre_typo():
+    await db.training_schedule.update_many({"type": "Jeu Livre"}, {"$set": {"type": "Jeu Libre"}})
+    notify_change("training_schedule")
+
+async def migrate_email_outbox_bodies():
+    # Bodies hold password-reset links: finished messages keep only their metadata, then expire
+    await db.email_outbox.update_many(
+        {"status": {"$in": ["sent", "failed"]}, "finished_at": {"$exists": False}},
+        {"$set": {"finished_at": datetime.now(timezone.utc)}, "$unset": {"html": ""}}
+    )
+
+# Numbered, idempotent migrations; append new ones with the next version number
+MIGRATIONS = [
+    (1, "achievements catalog", migrate_achievements_catalog),
+    (2, "default training schedule", migrate_default_training_schedule),
+    (3, "training type 'Jeu Livre' renamed 'Jeu Libre'", migrate_jeu_livre_typo),
+    (4, "finished email bodies removed", migrate_email_outbox_bodies),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+async def run_migrations():
+    """Bring the database to SCHEMA_VERSION; only the index check runs when it already is"""
+    # Always compared against the live indexes: index_report drives fallbacks such as email_taken
+    await ensure_indexes()
+    
+    marker = await db.schema_migrations.find_one({"_id": "schema"}) or {}
+    version = marker.get("version", 0)
+    if version >= SCHEMA_VERSION:
+        logger.info(f"Schema up to date (version {version})")
+        return
+    
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        await migrate()
+        notify_change("achievements")
+        notify_change("training_schedule")
+        await db.schema_migrations.update_one(
+            {"_id": "schema"},
+            {"$set": {"version": number, "applied_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+        logger.info(f"Migration {number} applied: {description}")
+
+def encode_cursor(doc: dict, sort_key: str) -> str:
+    raw = json.dumps([doc.get(sort_key), doc["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(raw)
+        if not isinstance(last_id, str):
+            raise ValueError(cursor)
+        return value, last_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+async def fetch_page(collection: str, sort_key: str, direction: int, cursor: Optional[str], limit: int,
+                     query: Optional[dict] = None, projection: Optional[dict] = None):
+    """Keyset pagination on (sort_key, id): every page costs one bounded index range scan.
+
+    Returns the documents and the opaque cursor of the next page (None on the last page).
+    """
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    query = dict(query or {})
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "$lt" if direction < 0 else "$gt"
+        keyset = {"$or": [{sort_key: {op: value}}, {sort_key: value, "id": {op: last_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+    projection = projection or {"_id": 0}
+    docs = await db[collection].find(query, projection).sort([(sort_key, direction), ("id", direction)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1], sort_key) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+class BatchLoader:
+    """DataLoader-style batching: lookups issued during the same event-loop
+    tick are resolved together with a single ``$in`` query, and each key is
+    fetched at most once per loader.
+    """
+
+    def __init__(self, collection: str, key: str = "id", projection: Optional[dict] = None):
+        self.collection = collection
+        self.key = key
+        self.projection = projection or {"_id": 0}
+        self._futures = {}
+        self._pending = []
+        self._tasks = set()
+
+    def load(self, key) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                loop.call_soon(self._schedule_dispatch)
+        return future
+
+    async def load_many(self, keys) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _schedule_dispatch(self):
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        keys, self._pending = self._pending, []
+        try:
+            docs = await db[self.collection].find({self.key: {"$in": keys}}, self.projection).to_list(None)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {doc[self.key]: doc for doc in docs}
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+class Loaders:
+    """Per-request set of batch loaders, injected with Depends(get_loaders)"""
+
+    def __init__(self):
+        self.achievements = BatchLoader("achievements")
+        self.members = BatchLoader("users", projection={"_id": 0, "id": 1, "nom": 1, "prenom": 1})
+
+def get_loaders() -> Loaders:
+    return Loaders()
+
+class _TreapNode:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+def _treap_size(node) -> int:
+    return node.size if node is not None else 0
+
+def _treap_split(node, key, inclusive: bool):
+    """Split into (keys < key, keys >= key), or (keys <= key, keys > key) when inclusive"""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        left, right = _treap_split(node.right, key, inclusive)
+        node.right = left
+        node.size = 1 + _treap_size(node.left) + _treap_size(node.right)
+        return node, right
+    left, right = _treap_split(node.left, key, inclusive)
+    node.left = right
+    node.size = 1 + _treap_size(node.left) + _treap_size(node.right)
+    return left, node
+
+def _treap_merge(left, right):
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _treap_merge(left.right, right)
+        left.size = 1 + _treap_size(left.left) + _treap_size(left.right)
+        return left
+    right.left = _treap_merge(left, right.left)
+    right.size = 1 + _treap_size(right.left) + _treap_size(right.right)
+    return right
+
+class Leaderboard:
+    """Licensed members ordered by points, kept in an order-statistics treap.
+
+    Keys are (-points, user_id), so updates, rank lookups and positional
+    reads are all O(log n).
+    """
+
+    def __init__(self):
+        self._root = None
+        self._entries = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove_key(self, key):
+        left, right = _treap_split(self._root, key, False)
+        _, right = _treap_split(right, key, True)
+        self._root = _treap_merge(left, right)
+
+    def _insert_key(self, key):
+        left, right = _treap_split(self._root, key, False)
+        self._root = _treap_merge(_treap_merge(left, _TreapNode(key)), right)
+
+    def _count_less(self, key) -> int:
+        node, count = self._root, 0
+        while node is not None:
+            if node.key < key:
+                count += 1 + _treap_size(node.left)
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def _select(self, index: int):
+        node = self._root
+        while node is not None:
+            left_size = _treap_size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.key
+            else:
+                index -= left_size + 1
+                node = node.right
+        return None
+
+    def update(self, user: dict):
+        """Insert, move or drop a member according to its current document"""
+        previous = self._entries.pop(user["id"], None)
+        if previous is not None:
+            self._remove_key(previous[0])
+        if not user.get("est_licencie"):
+            return
+        key = (-user.get("points", 0), user["id"])
+        self._entries[user["id"]] = (key, user)
+        self._insert_key(key)
+
+    def remove(self, user_id: str):
+        previous = self._entries.pop(user_id, None)
+        if previous is not None:
+            self._remove_key(previous[0])
+
+    def rebuild(self, users):
+        self._root = None
+        self._entries = {}
+        for user in users:
+            self.update(user)
+        self.ready = True
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Competition rank: members with the same points share a rank"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        return 1 + self._count_less((entry[0][0], ""))
+
+    def position(self, user_id: str) -> Optional[int]:
+        entry = self._entries.get(user_id)
+        return self._count_less(entry[0]) if entry is not None else None
+
+    def slice(self, start: int, stop: int) -> List[dict]:
+        start, stop = max(0, start), min(stop, len(self._entries))
+        ranked = []
+        for index in range(start, stop):
+            key = self._select(index)
+            user = self._entries[key[1]][1]
+            ranked.append({**user, "rang": 1 + self._count_less((key[0], ""))})
+        return ranked
+
+    def top(self, limit: int, offset: int = 0) -> List[dict]:
+        return self.slice(offset, offset + limit)
+
+    def around(self, user_id: str, radius: int) -> List[dict]:
+        position = self.position(user_id)
+        if position is None:
+            return []
+        return self.slice(position - radius, position + radius + 1)
+
 def generate_verification_code():
     import random
     return ''.join([str(random.randint(0, 9)) for _ in range(6)])
@@ -182,6 +1307,7 @@ class Tournament(BaseModel):
     date_fin: str
     statut: str
     participants: List[str] = []
+    participants_details: Optional[List[dict]] = None
     max_participants: int = 16
     est_payant: bool = False
     prix: float = 0.0
@@ -215,6 +1341,10 @@ class MatchCreate(BaseModel):
     heure: str
     lieu: str
 
+class MatchScoreUpdate(BaseModel):
+    score_a: int = Field(ge=0)
+    score_b: int = Field(ge=0)
+
 class News(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -256,6 +1386,25 @@ class TrainingScheduleUpdate(BaseModel):
     licence_requise: Optional[str] = None
     description: Optional[str] = None
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class BulkOperation(BaseModel):
+    op: str
+    id: Optional[str] = None
+    data: dict = {}
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+    ordered: bool = True
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None
+    path: str
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
@@ -263,67 +1412,872 @@ class ResetPasswordRequest(BaseModel):
     token: str
     new_password: str
 
-async def send_email_async(to_email: str, subject: str, html_content: str):
-    """Enviar email usando Resend API ou SMTP ou salvar em arquivo de teste"""
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
+async def run_bulk(collection: str, request: BulkRequest, build):
+    """Execute a list of operations against one collection as a single bulk_write.
+
+    ``build(operation, current_doc)`` returns (pymongo request, result fields)
+    or raises HTTPException. Targets are prefetched with one ``$in`` query so
+    each item can report "not found". Ordered requests stop at the first
+    failing item, like MongoDB does. Returns (per-item results, applied items)
+    where applied items are (operation, current_doc) pairs.
+    """
+    if len(request.operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Maximum {BULK_MAX_OPERATIONS} opérations par requête")
     
-    SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-    SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
-    SMTP_EMAIL = os.environ.get('SMTP_EMAIL', '')
-    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+    target_ids = list({operation.id for operation in request.operations if operation.id})
+    current = {}
+    if target_ids:
+        current = {doc["id"]: doc for doc in await db[collection].find({"id": {"$in": target_ids}}, {"_id": 0, "password_hash": 0}).to_list(None)}
     
-    # Se usar Resend API
-    if RESEND_API_KEY and RESEND_API_KEY not in ['your_resend_api_key_here', '']:
+    results, writes, positions = [], [], []
+    stopped = False
+    for index, operation in enumerate(request.operations):
+        if stopped:
+            results.append({"index": index, "statut": "non_execute"})
+            continue
         try:
-            params = {
-                "from": SENDER_EMAIL,
-                "to": [to_email],
-                "subject": subject,
-                "html": html_content
-            }
-            await asyncio.to_thread(resend.Emails.send, params)
-            logger.info(f"✅ Email sent via Resend: {subject} to {to_email}")
-            return
-        except Exception as e:
-            logger.warning(f"⚠️ Resend failed: {str(e)}")
+            if operation.op != "create" and operation.id not in current:
+                raise HTTPException(status_code=404, detail="Élément non trouvé")
+            write, fields = build(operation, current.get(operation.id))
+        except HTTPException as e:
+            results.append({"index": index, "statut": "erreur", "erreur": e.detail})
+            stopped = request.ordered
+            continue
+        except ValidationError as e:
+            results.append({"index": index, "statut": "erreur", "erreur": e.errors(include_url=False)})
+            stopped = request.ordered
+            continue
+        results.append({"index": index, "statut": "ok", **fields})
+        writes.append(write)
+        positions.append(index)
     
-    # Tentar SMTP se credenciais estão completas
-    if SMTP_EMAIL and SMTP_PASSWORD and SMTP_PASSWORD not in ['sua_app_password_aqui', '']:
+    if writes:
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = SMTP_EMAIL
-            msg['To'] = to_email
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            def send_smtp():
-                with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                    server.starttls()
-                    server.login(SMTP_EMAIL, SMTP_PASSWORD)
-                    server.send_message(msg)
-            
-            await asyncio.to_thread(send_smtp)
-            logger.info(f"✅ Email sent via SMTP: {subject} to {to_email}")
+            await db[collection].bulk_write(writes, ordered=request.ordered)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            for error in write_errors:
+                results[positions[error["index"]]] = {"index": positions[error["index"]], "statut": "erreur", "erreur": error.get("errmsg")}
+            if request.ordered and write_errors:
+                for position in positions[write_errors[0]["index"] + 1:]:
+                    results[position] = {"index": position, "statut": "non_execute"}
+        if collection in DOMAIN_CACHE_TTLS:
+            notify_change(collection)
+    
+    applied = [
+        (request.operations[result["index"]], current.get(request.operations[result["index"]].id))
+        for result in results if result["statut"] == "ok"
+    ]
+    return results, applied
+
+def bulk_summary(results: List[dict]) -> dict:
+    return {
+        "succes": sum(1 for result in results if result["statut"] == "ok"),
+        "echecs": sum(1 for result in results if result["statut"] != "ok"),
+        "resultats": results
+    }
+
+async def build_cached_payload(collection: str, loader, adapter: TypeAdapter) -> dict:
+    """Validate and serialize one response once, with its compressed variants and validators.
+
+    ``loader`` returns (documents, next cursor). The ETag combines the
+    collection version counter with a digest of the body, so data refreshed
+    after a TTL expiry also gets a new tag. Last-Modified is the time the
+    documents were read: every worker stamps its own copy, and a copy read
+    earlier than the client's is never newer than it.
+    """
+    version = domain_cache.version(collection)
+    modified_at = time.time()
+    docs, next_cursor = await loader()
+    body = adapter.dump_json(adapter.validate_python(docs))
+    payload = {
+        "etag": f'"{collection}-{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+        "last_modified": formatdate(modified_at, usegmt=True),
+        "modified_at": int(modified_at),
+        "next_cursor": next_cursor,
+    }
+    payload.update(compress_variants(body))
+    return payload
+
+def compress_variants(body: bytes) -> dict:
+    variants = {"identity": body}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        variants["gzip"] = compressor.compress(body) + compressor.flush()
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=5)
+    return variants
+
+def is_not_modified(request: Request, payload: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or payload["etag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= payload["modified_at"]
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def choose_encoding(request: Request, payload: dict) -> Optional[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in payload and encoding in accepted:
+            return encoding
+    return None
+
+async def cached_json_response(request: Request, collection: str, key, loader, adapter: TypeAdapter) -> Response:
+    """Serve a list endpoint from cached bytes: no database, validation or compression on a hit"""
+    payload = await domain_cache.get_or_load(
+        collection, ("payload", key), lambda: build_cached_payload(collection, loader, adapter)
+    )
+    return payload_response(request, payload)
+
+def payload_response(request: Request, payload: dict) -> Response:
+    headers = {
+        "ETag": payload["etag"],
+        "Last-Modified": payload["last_modified"],
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if payload["next_cursor"]:
+        headers["X-Next-Cursor"] = payload["next_cursor"]
+    if is_not_modified(request, payload):
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(request, payload)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=payload[encoding or "identity"], media_type="application/json", headers=headers)
+
+def dumps_json(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+def compile_projection(model: type):
+    """Build a function copying a trusted database document onto the fields of ``model``.
+
+    Documents written by this service already match the model, so the
+    response path only has to drop private fields and fill defaults; it
+    skips Pydantic validation entirely. Untrusted input must not use it.
+    """
+    fields = [
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    ]
+    required = {name for name, field in model.model_fields.items() if field.is_required()}
+
+    def project(doc: dict) -> dict:
+        return {name: doc[name] if name in required else doc.get(name, default) for name, default in fields}
+
+    return project
+
+project_user = compile_projection(User)
+project_match = compile_projection(Match)
+
+def fast_json_response(project, docs: List[dict], headers: Optional[dict] = None) -> Response:
+    """Serialize trusted documents directly, bypassing response_model validation"""
+    return Response(content=dumps_json([project(doc) for doc in docs]), media_type="application/json", headers=headers)
+
+async def stream_rows(cursor, columns: List[str], file_format: str, compress: bool):
+    """Encode documents from a Motor cursor as CSV or NDJSON while they arrive.
+
+    Rows are flushed every EXPORT_FLUSH_ROWS documents (with a gzip sync
+    flush when compressing), so memory stays flat and the client starts
+    receiving data before the query is exhausted.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    
+    def encode(text: str, final: bool = False) -> bytes:
+        data = text.encode("utf-8")
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if file_format == "csv":
+        writer.writerow(columns)
+        yield encode(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+    
+    pending = 0
+    async for doc in cursor:
+        if file_format == "csv":
+            writer.writerow([doc.get(column, "") for column in columns])
+        else:
+            buffer.write(json.dumps({column: doc.get(column) for column in columns}, ensure_ascii=False))
+            buffer.write("\n")
+        pending += 1
+        if pending >= EXPORT_FLUSH_ROWS:
+            yield encode(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield encode(buffer.getvalue(), final=True)
+
+def export_response(cursor, columns: List[str], file_format: str, compress: bool, filename: str) -> StreamingResponse:
+    if file_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format non supporté (csv ou ndjson)")
+    filename = f"{filename}.{file_format}"
+    media_type = "text/csv; charset=utf-8" if file_format == "csv" else "application/x-ndjson"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_rows(cursor.batch_size(EXPORT_BATCH_SIZE), columns, file_format, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for ``reset_timeout`` seconds.
+
+    After ``failure_threshold`` consecutive failures the breaker opens; once
+    the timeout has elapsed a single probe call is let through (half-open)
+    and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips, "retry_after": round(self.retry_after(), 1)}
+
+class DatabaseUnavailable(ConnectionFailure):
+    """Raised without contacting MongoDB while the database circuit breaker is open"""
+
+class DatabaseBreaker(CircuitBreaker):
+    """Circuit breaker in front of every MongoDB operation.
+
+    Connection failures count towards ``failure_threshold``; once open, every
+    operation fails at once with DatabaseUnavailable instead of waiting for
+    server selection. Requests never probe: a background task pings the
+    server every ``probe_interval`` seconds and closes the breaker when it
+    answers.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, probe_interval: float):
+        super().__init__(name, failure_threshold, probe_interval)
+        self.probe_interval = probe_interval
+        self.rejected = 0
+        self.probes = 0
+        self._task = None
+
+    async def call(self, operation, *args, **kwargs):
+        if self.state != "closed":
+            self.rejected += 1
+            raise DatabaseUnavailable(f"{self.name} unavailable")
+        try:
+            result = await operation(*args, **kwargs)
+        except DatabaseUnavailable:
+            raise
+        except ConnectionFailure:
+            self.record_failure()
+            raise
+        if self.failures:
+            self.record_success()
+        return result
+
+    def start(self):
+        if self._task is None and client is not None:
+            self._task = asyncio.create_task(self._probe_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe_periodically(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            if self.state == "closed":
+                continue
+            self.probes += 1
+            try:
+                await client.admin.command("ping")
+            except Exception as e:
+                self.record_failure()
+                logger.warning(f"{self.name} still unreachable: {e}")
+            else:
+                self.record_success()
+                logger.info(f"{self.name} reachable again, circuit breaker closed")
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rejected": self.rejected, "probes": self.probes}
+
+class GuardedCursor:
+    """Motor cursor whose round trips go through the database breaker"""
+
+    def __init__(self, cursor, breaker: DatabaseBreaker):
+        self._cursor = cursor
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in CURSOR_CHAIN_METHODS:
+            def chain(*args, **kwargs):
+                attr(*args, **kwargs)
+                return self
+            return chain
+        return attr
+
+    async def to_list(self, length):
+        return await self._breaker.call(self._cursor.to_list, length)
+
+    async def __aiter__(self):
+        if self._breaker.state != "closed":
+            self._breaker.rejected += 1
+            raise DatabaseUnavailable(f"{self._breaker.name} unavailable")
+        try:
+            async for doc in self._cursor:
+                yield doc
+        except DatabaseUnavailable:
+            raise
+        except ConnectionFailure:
+            self._breaker.record_failure()
+            raise
+
+class GuardedCollection:
+    """Motor collection whose operations go through the database breaker"""
+
+    def __init__(self, collection, breaker: DatabaseBreaker):
+        self._collection = collection
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in CURSOR_METHODS:
+            return lambda *args, **kwargs: GuardedCursor(attr(*args, **kwargs), self._breaker)
+        if name in GUARDED_METHODS:
+            return lambda *args, **kwargs: self._breaker.call(attr, *args, **kwargs)
+        return attr
+
+class GuardedDatabase:
+    """Motor database handing out breaker-guarded collections"""
+
+    def __init__(self, database, breaker: DatabaseBreaker):
+        self._database = database
+        self._breaker = breaker
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> GuardedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = GuardedCollection(self._database[name], self._breaker)
+        return collection
+
+    def __getattr__(self, name: str) -> GuardedCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+CURSOR_METHODS = {"find", "aggregate"}
+CURSOR_CHAIN_METHODS = {"sort", "skip", "limit", "batch_size", "hint", "max_time_ms", "collation"}
+# Change streams (watch) reconnect on their own and stay unguarded
+GUARDED_METHODS = {
+    "find_one", "find_one_and_update", "find_one_and_delete", "count_documents", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "bulk_write", "index_information", "create_index", "drop_index",
+}
+
+database_breaker = DatabaseBreaker("MongoDB", MONGO_BREAKER_FAILURES, MONGO_BREAKER_PROBE_SECONDS)
+if db is not None:
+    db = GuardedDatabase(db, database_breaker)
+
+# Set per request by DatabaseOutageMiddleware; records the age of snapshots served while the database is down
+_snapshot_ages = contextvars.ContextVar("snapshot_ages", default=None)
+
+def mark_stale(loaded_at: float):
+    ages = _snapshot_ages.get()
+    if ages is not None:
+        ages.append(time.time() - loaded_at)
+
+class DatabaseOutageMiddleware:
+    """Adds ``X-Data-Stale`` (age in seconds of the oldest snapshot used) to responses built from snapshots"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        ages = []
+        token = _snapshot_ages.set(ages)
+
+        async def send_with_staleness(message):
+            if message["type"] == "http.response.start" and ages:
+                MutableHeaders(scope=message)["X-Data-Stale"] = str(int(max(ages)))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_staleness)
+        finally:
+            _snapshot_ages.reset(token)
+
+class JournalFull(Exception):
+    """The write journal reached WRITE_JOURNAL_MAX_BYTES"""
+
+class ReplayPaused(Exception):
+    """A replayed write failed on the server side: it stays in the journal and is retried later"""
+
+class WriteJournal:
+    """Append-only journal of the API writes received while MongoDB is unavailable.
+
+    Each write request is stored as one JSON line: method, path, body and the
+    principal its bearer token authenticated. Appends from concurrent
+    requests are grouped and written with a single fsync, then every request
+    of the group is answered 202. The file is shared by the workers of a host
+    (``flock`` around appends). Once the database is back, one worker replays
+    the entries in order through the application. New writes keep going to
+    the journal until it is empty, so they stay behind the ones it holds.
+
+    Replay is at most once: an entry is marked ``replaying`` in
+    ``journal_entries`` before it runs and ``applied`` after, and a marked
+    entry is never run again. A request that the API now rejects (missing
+    target, business rule, revoked token) or whose replay was interrupted is
+    recorded as a conflict for the referents instead. A server error (5xx)
+    is not a conflict: the replay stops there and the entry is retried on
+    the next round. Lines that cannot be
+    replayed at all (unparseable, or torn by a crash mid-append) are moved
+    to ``<path>.conflicts`` and skipped.
+    """
+
+    def __init__(self, path: str, flush_delay: float, max_bytes: int):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.conflicts_path = f"{path}.conflicts"
+        self.flush_delay = flush_delay
+        self.max_bytes = max_bytes
+        self._buffer = []
+        self._buffered_bytes = 0
+        # Entries whose replay failed with a server error, retried although their marker says replaying
+        self._retry = set()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self.replaying = False
+        self._counters = {"accepted": 0, "fsyncs": 0, "replayed": 0, "conflicts": 0, "unreadable": 0, "refused": 0}
+
+    def start(self):
+        if db is None or self._tasks:
             return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._tasks = [asyncio.create_task(self._flush_periodically()), asyncio.create_task(self._replay_periodically())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._buffer:
+            await self._flush()
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def pending(self) -> bool:
+        return self.size() > 0
+
+    async def append(self, entry: dict):
+        """Return once the entry is on disk, together with those queued alongside it"""
+        line = dumps_json(entry) + b"\n"
+        if self.size() + self._buffered_bytes + len(line) > self.max_bytes:
+            self._counters["refused"] += 1
+            raise JournalFull()
+        written = asyncio.get_running_loop().create_future()
+        self._buffer.append((line, written))
+        self._buffered_bytes += len(line)
+        self._wakeup.set()
+        await written
+        self._counters["accepted"] += 1
+
+    async def _flush_periodically(self):
+        while True:
+            await self._wakeup.wait()
+            # Let the requests arriving meanwhile share this fsync
+            await asyncio.sleep(self.flush_delay)
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._buffer = self._buffer, []
+        self._buffered_bytes = 0
+        try:
+            await asyncio.to_thread(self._write, b"".join(line for line, _ in batch))
         except Exception as e:
-            logger.error(f"⚠️ SMTP error: {str(e)}")
-    
-    # Fallback: Salvar em arquivo (para teste/desenvolvimento)
+            logger.error(f"Write journal append failed: {e}")
+            for _, written in batch:
+                if not written.done():
+                    written.set_exception(e)
+            return
+        self._counters["fsyncs"] += 1
+        for _, written in batch:
+            if not written.done():
+                written.set_result(None)
+
+    def _write(self, data: bytes):
+        with open(self.path, "ab") as journal:
+            with file_lock(journal):
+                journal.write(data)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path) as offset_file:
+                return int(offset_file.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        temporary = f"{self.offset_path}.tmp"
+        with open(temporary, "w") as offset_file:
+            offset_file.write(str(offset))
+            offset_file.flush()
+            os.fsync(offset_file.fileno())
+        os.replace(temporary, self.offset_path)
+
+    def _read_from(self, offset: int) -> bytes:
+        with open(self.path, "rb") as journal:
+            with file_lock(journal):
+                journal.seek(offset)
+                return journal.read()
+
+    def _truncate_if_replayed(self, offset: int) -> bool:
+        with open(self.path, "r+b") as journal:
+            with file_lock(journal):
+                size = os.fstat(journal.fileno()).st_size
+                if size < offset:
+                    # Offset left over from another journal file: start again, replayed entries are skipped
+                    self._write_offset(0)
+                if size != offset:
+                    return False
+                journal.truncate(0)
+                os.fsync(journal.fileno())
+                self._write_offset(0)
+                return True
+
+    async def _replay_periodically(self):
+        while True:
+            await asyncio.sleep(MONGO_BREAKER_PROBE_SECONDS)
+            if database_breaker.state != "closed" or not self.pending():
+                continue
+            with open(f"{self.path}.replay", "a") as replay_lock:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(replay_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # another worker is replaying
+                try:
+                    await self.replay()
+                except (ConnectionFailure, ReplayPaused) as e:
+                    logger.warning(f"Write journal replay paused, will resume later: {e}")
+                except Exception as e:
+                    logger.error(f"Write journal replay failed: {e}")
+
+    async def replay(self):
+        self.replaying = True
+        try:
+            while True:
+                offset = await asyncio.to_thread(self._read_offset)
+                data = await asyncio.to_thread(self._read_from, offset)
+                if not data:
+                    if await asyncio.to_thread(self._truncate_if_replayed, offset):
+                        logger.info("Write journal fully replayed")
+                        return
+                    continue
+                # Appends hold the lock for whole lines, so a line without its newline was torn by a crash
+                for line in data.splitlines(keepends=True):
+                    try:
+                        entry = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        entry = None
+                    if (not isinstance(entry, dict) or not JOURNAL_ENTRY_KEYS <= entry.keys()
+                            or not isinstance(entry["principal"], dict)):
+                        await asyncio.to_thread(self._set_aside, line)
+                    else:
+                        await self._replay_entry(entry)
+                    offset += len(line)
+                    await asyncio.to_thread(self._write_offset, offset)
+        finally:
+            self.replaying = False
+
+    def _set_aside(self, line: bytes):
+        logger.error(f"Unreadable write journal line moved to {self.conflicts_path}")
+        with open(self.conflicts_path, "ab") as conflicts:
+            conflicts.write(line if line.endswith(b"\n") else line + b"\n")
+            conflicts.flush()
+            os.fsync(conflicts.fileno())
+        self._counters["unreadable"] += 1
+
+    async def _replay_entry(self, entry: dict):
+        try:
+            await db.journal_entries.insert_one({
+                "id": entry["id"], "at": entry["at"], "method": entry["method"], "path": entry["path"],
+                "user_id": entry["principal"]["id"], "status": "replaying",
+            })
+        except DuplicateKeyError:
+            marker = await db.journal_entries.find_one({"id": entry["id"]}, {"_id": 0})
+            if not marker or marker["status"] != "replaying":
+                return
+            if entry["id"] not in self._retry:
+                await self._record_conflict(entry, None, "Rejeu interrompu, résultat inconnu")
+                return
+        recorded = entry["principal"]
+        if entry["at"] < _revoked_before.get(recorded["id"], 0):
+            await self._record_conflict(entry, None, "Token révoqué depuis l'enregistrement")
+            return
+        # Authorize with the account as it is now, not as it was when the write was journaled
+        user = await db.users.find_one({"id": recorded["id"]}, {"_id": 0, "role": 1, "est_licencie": 1})
+        if user is None:
+            await self._record_conflict(entry, None, "Compte supprimé depuis l'enregistrement")
+            return
+        if user.get("role", "user") != recorded["role"]:
+            await self._record_conflict(entry, None, "Rôle modifié depuis l'enregistrement")
+            return
+        principal = {"id": recorded["id"], "role": user.get("role", "user"), "est_licencie": user.get("est_licencie", False)}
+        status, _, body = await call_app(
+            entry["method"], entry["path"], entry["query"], entry["headers"],
+            base64.b64decode(entry["body"]), principal, journal_replay=True
+        )
+        if status >= 500:
+            # Reset the marker so the next round runs the entry again; if the database is
+            # unreachable for that too, this worker remembers it instead
+            try:
+                await db.journal_entries.delete_one({"id": entry["id"], "status": "replaying"})
+                self._retry.discard(entry["id"])
+            except ConnectionFailure:
+                self._retry.add(entry["id"])
+            raise ReplayPaused(f"{entry['method']} {entry['path']} answered {status}")
+        self._retry.discard(entry["id"])
+        if status >= 400:
+            try:
+                detail = json.loads(body).get("detail")
+            except (ValueError, AttributeError):
+                detail = None
+            await self._record_conflict(entry, status, str(detail or "Requête rejetée au rejeu"))
+            return
+        await db.journal_entries.update_one({"id": entry["id"]}, {"$set": {"status": "applied", "response_status": status}})
+        self._counters["replayed"] += 1
+
+    async def _record_conflict(self, entry: dict, status: Optional[int], reason: str):
+        logger.warning(f"Write journal conflict on {entry['method']} {entry['path']}: {reason}")
+        await db.journal_entries.update_one(
+            {"id": entry["id"]},
+            {"$set": {"status": "conflict", "response_status": status, "reason": reason,
+                      "body": entry["body"], "query": entry["query"]}}
+        )
+        self._counters["conflicts"] += 1
+
+    def stats(self) -> dict:
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return {"pending_bytes": max(0, size - self._read_offset()), "replaying": self.replaying, **self._counters}
+
+@contextlib.contextmanager
+def file_lock(file):
+    """Exclusive flock for the duration of the block; a no-op where fcntl is unavailable"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(file, fcntl.LOCK_EX)
     try:
-        import hashlib
-        email_hash = hashlib.md5(to_email.encode()).hexdigest()[:8]
-        email_file = f"/tmp/email_{email_hash}_{int(datetime.now(timezone.utc).timestamp())}.html"
-        
-        # Extrair código se existir
-        code_match = __import__('re').search(r'>(\d{6})<', html_content)
-        code = code_match.group(1) if code_match else "N/A"
-        
-        with open(email_file, 'w', encoding='utf-8') as f:
-            f.write(f"""
+        yield
+    finally:
+        fcntl.flock(file, fcntl.LOCK_UN)
+
+JOURNAL_ENTRY_KEYS = {"id", "at", "method", "path", "query", "headers", "body", "principal"}
+write_journal = WriteJournal(WRITE_JOURNAL_PATH, WRITE_JOURNAL_FLUSH_SECONDS, WRITE_JOURNAL_MAX_BYTES)
+
+class WriteJournalMiddleware:
+    """Journals API writes while the database is down or the journal is not yet replayed, answering 202"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in JOURNALED_METHODS or scope.get("journal_replay")
+                or not scope["path"].startswith("/api/") or scope["path"].startswith(JOURNAL_EXCLUDED_PREFIXES)
+                or db is None or (database_breaker.state == "closed" and not write_journal.pending())):
+            await self.app(scope, receive, send)
+            return
+        response = await self.accept(scope, receive)
+        await response(scope, receive, send)
+
+    async def accept(self, scope, receive) -> Response:
+        headers = Headers(scope=scope)
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            # Only members are journaled: anonymous writes cannot fill the disk during an outage
+            return JSONResponse(status_code=403, content={"detail": "Not authenticated"})
+        try:
+            principal = await authenticate_access_token(token)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+        except ConnectionFailure:
+            return JSONResponse(status_code=503, content={"detail": "Base de données momentanément indisponible"})
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            if len(body) > WRITE_JOURNAL_MAX_BODY_BYTES:
+                return JSONResponse(status_code=503, content={"detail": "Base de données momentanément indisponible"})
+            if not message.get("more_body"):
+                break
+        import uuid
+        entry = {
+            "id": str(uuid.uuid4()),
+            "at": time.time(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope["query_string"].decode(),
+            "headers": [[key, value] for key, value in headers.items() if key == "content-type"],
+            "body": base64.b64encode(bytes(body)).decode(),
+            "principal": principal,
+        }
+        try:
+            await write_journal.append(entry)
+        except JournalFull:
+            return JSONResponse(status_code=503, content={"detail": "Base de données indisponible et journal des modifications plein"})
+        except OSError:
+            return JSONResponse(status_code=503, content={"detail": "Base de données momentanément indisponible"})
+        return JSONResponse(status_code=202, content={
+            "detail": "Base de données indisponible : la modification est enregistrée et sera appliquée à son retour",
+            "journal_id": entry["id"],
+        })
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP connections open between messages.
+
+    smtplib is blocking, so each send runs in a thread; a connection is used
+    by one thread at a time and goes back to the pool afterwards. Connections
+    idle for longer than ``idle_timeout`` are closed instead of reused.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, starttls: bool, size: int, idle_timeout: float):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self.connections_opened = 0
+
+    def _connect(self):
+        connection = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            connection.starttls()
+        if self.password:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _send_sync(self, connection, message):
+        if connection is None:
+            connection = self._connect()
+        try:
+            connection.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server dropped an idle connection: one retry on a fresh one
+            connection.close()
+            connection = self._connect()
+            connection.send_message(message)
+        return connection
+
+    async def send(self, message):
+        connection = None
+        while self._idle and connection is None:
+            candidate, idle_since = self._idle.pop()
+            if time.monotonic() - idle_since < self.idle_timeout:
+                connection = candidate
+            else:
+                await asyncio.to_thread(self._close, candidate)
+        try:
+            connection = await asyncio.to_thread(self._send_sync, connection, message)
+        except Exception:
+            if connection is not None:
+                connection.close()
+            raise
+        if len(self._idle) < self.size:
+            self._idle.append((connection, time.monotonic()))
+        else:
+            await asyncio.to_thread(self._close, connection)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            await asyncio.to_thread(self._close, connection)
+
+def _write_email_file(to_email: str, subject: str, html_content: str) -> str:
+    """Salvar o email em arquivo (para teste/desenvolvimento)"""
+    email_hash = hashlib.md5(to_email.encode()).hexdigest()[:8]
+    email_file = f"/tmp/email_{email_hash}_{int(datetime.now(timezone.utc).timestamp())}.html"
+    
+    # Extrair código se existir
+    code_match = re.search(r'>(\d{6})<', html_content)
+    code = code_match.group(1) if code_match else "N/A"
+    
+    with open(email_file, 'w', encoding='utf-8') as f:
+        f.write(f"""
 <!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><title>Email</title></head>
@@ -339,61 +2293,770 @@ async def send_email_async(to_email: str, subject: str, html_content: str):
 </div>
 </body>
 </html>
-            """)
-        
-        logger.info(f"✅ Email saved to file: {email_file}")
-        print(f"\n{'='*70}")
-        print(f"📧 EMAIL ENVIADO PARA: {to_email}")
-        print(f"Assunto: {subject}")
-        print(f"Código: {code}")
-        print(f"Arquivo: {email_file}")
-        print(f"{'='*70}\n")
+        """)
+    
+    print(f"\n{'='*70}")
+    print(f"📧 EMAIL ENVIADO PARA: {to_email}")
+    print(f"Assunto: {subject}")
+    print(f"Código: {code}")
+    print(f"Arquivo: {email_file}")
+    print(f"{'='*70}\n")
+    return email_file
+
+class EmailOutbox:
+    """Durable outbox: handlers insert messages, a pool of workers delivers them.
+
+    Messages live in the ``email_outbox`` collection. A worker claims one by
+    moving its ``next_attempt_at`` forward by a lease, so a message claimed by
+    a crashed process is picked up again once the lease expires. Failed
+    deliveries are retried with exponential backoff and jitter, and each
+    provider sits behind its own circuit breaker. Without any configured
+    provider, messages are written to /tmp (development).
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._tasks = []
+        self._wakeup = None
+        self.providers = []
+        if RESEND_API_KEY and RESEND_API_KEY not in ['your_resend_api_key_here', '']:
+            self.providers.append(("resend", self._send_resend))
+        if SMTP_ENABLED:
+            self.smtp_pool = SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, SMTP_EMAIL,
+                                                SMTP_PASSWORD if SMTP_AUTH != 'none' else '', SMTP_STARTTLS,
+                                                self.workers, SMTP_IDLE_SECONDS)
+            self.providers.append(("smtp", self._send_smtp))
+        else:
+            self.smtp_pool = None
+        if not self.providers:
+            self.providers.append(("file", self._send_file))
+        self.breakers = {name: CircuitBreaker(f"email:{name}", EMAIL_BREAKER_FAILURES, EMAIL_BREAKER_RESET_SECONDS)
+                         for name, _ in self.providers}
+        self._counters = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.smtp_pool is not None:
+            await self.smtp_pool.close()
+
+    async def enqueue(self, to_email: str, subject: str, html_content: str) -> Optional[str]:
+        import uuid
+        message = {
+            "id": str(uuid.uuid4()),
+            "to": to_email,
+            "subject": subject,
+            "html": html_content,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": time.time(),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            await db.email_outbox.insert_one(message)
+        except Exception as e:
+            logger.error(f"❌ Could not queue email '{subject}' to {to_email}: {e}")
+            return None
+        self._counters["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return message["id"]
+
+    async def _claim(self) -> Optional[dict]:
+        now = time.time()
+        return await db.email_outbox.find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "next_attempt_at": now + EMAIL_LEASE_SECONDS}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _work(self):
+        while True:
+            try:
+                message = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Email outbox unavailable: {e}")
+                message = None
+            if message is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), EMAIL_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._deliver(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+
+    async def _deliver(self, message: dict):
+        errors = []
+        for name, send in self.providers:
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                errors.append(f"{name}: circuit ouvert")
+                continue
+            try:
+                await send(message)
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{name}: {e}")
+                logger.warning(f"⚠️ {name} failed for '{message['subject']}': {e}")
+                continue
+            breaker.record_success()
+            await db.email_outbox.update_one(
+                {"id": message["id"]},
+                {"$set": {"status": "sent", "provider": name, "sent_at": datetime.now(timezone.utc).isoformat(),
+                          "finished_at": datetime.now(timezone.utc)},
+                 "$inc": {"attempts": 1}, "$unset": {"next_attempt_at": "", "html": ""}}
+            )
+            self._counters["sent"] += 1
+            logger.info(f"✅ Email sent via {name}: {message['subject']} to {message['to']}")
+            return
         
-    except Exception as e:
-        logger.error(f"❌ Failed to save email: {str(e)}")
+        attempts = message.get("attempts", 0) + 1
+        if attempts >= EMAIL_MAX_ATTEMPTS:
+            await db.email_outbox.update_one(
+                {"id": message["id"]},
+                {"$set": {"status": "failed", "last_error": "; ".join(errors), "attempts": attempts,
+                          "finished_at": datetime.now(timezone.utc)},
+                 "$unset": {"next_attempt_at": "", "html": ""}}
+            )
+            self._counters["failed"] += 1
+            logger.error(f"❌ Email '{message['subject']}' to {message['to']} abandoned after {attempts} attempts")
+            return
+        delay = min(EMAIL_BACKOFF_MAX_SECONDS, EMAIL_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+        delay = max(delay * random.uniform(0.5, 1.0), min(breaker.retry_after() for breaker in self.breakers.values()))
+        await db.email_outbox.update_one(
+            {"id": message["id"]},
+            {"$set": {"status": "pending", "next_attempt_at": time.time() + delay, "last_error": "; ".join(errors),
+                      "attempts": attempts}}
+        )
+        self._counters["retried"] += 1
+
+    async def _send_resend(self, message: dict):
+        params = {
+            "from": SENDER_EMAIL,
+            "to": [message["to"]],
+            "subject": message["subject"],
+            "html": message["html"]
+        }
+        await asyncio.to_thread(resend.Emails.send, params)
+
+    async def _send_smtp(self, message: dict):
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = message["subject"]
+        msg['From'] = SMTP_EMAIL
+        msg['To'] = message["to"]
+        msg.attach(MIMEText(message["html"], 'html'))
+        await self.smtp_pool.send(msg)
+
+    async def _send_file(self, message: dict):
+        await asyncio.to_thread(_write_email_file, message["to"], message["subject"], message["html"])
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "providers": [name for name, _ in self.providers],
+            **self._counters,
+            "smtp_connections_opened": self.smtp_pool.connections_opened if self.smtp_pool else 0,
+            "breakers": {name: breaker.stats() for name, breaker in self.breakers.items()},
+        }
+
+email_outbox = EmailOutbox(EMAIL_WORKERS)
+
+def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES):
+    to_encode = data.copy()
+    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
+    # Fractional iat so a token issued right after a revocation is not mistaken for an older one
+    to_encode.update({"exp": expire, "iat": time.time()})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def create_user_tokens(user: dict) -> dict:
+    """Short-lived access token carrying the authorization claims, plus a refresh token"""
+    access_token = create_access_token({
+        "sub": user["id"],
+        "type": "access",
+        "role": user.get("role", "user"),
+        "est_licencie": bool(user.get("est_licencie", False))
+    })
+    refresh_token = create_access_token({"sub": user["id"], "type": "refresh"}, REFRESH_TOKEN_EXPIRE_MINUTES)
+    return {"token": access_token, "refresh_token": refresh_token}
+
+# user_id -> time before which access tokens of that user are rejected
+_revoked_before = {}
+
+def revoke_tokens(user_id: str):
+    """Reject the access tokens already issued to a user whose claims changed"""
+    notify_change("revocations", user_id, {"at": time.time()})
+
+def _record_revocation(user_id: str, revoked_at: float):
+    horizon = time.time() - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    for revoked_id, previous in list(_revoked_before.items()):
+        if previous < horizon:
+            del _revoked_before[revoked_id]
+    _revoked_before[user_id] = max(revoked_at, _revoked_before.get(user_id, 0))
+
+def decode_token(token: str, expected_type: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expiré")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token invalide")
+    # Tokens issued before claims were introduced only carry "sub"
+    if payload.get("type", "access") != expected_type or payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Token invalide")
+    return payload
+
+async def load_user(user_id: str) -> Optional[dict]:
+    """Return the user principal, served from principal_cache when possible"""
+    cached = principal_cache.get(user_id)
+    if cached is _USER_NOT_FOUND:
+        return None
+    if cached is not None:
+        return dict(cached)
+    generation = principal_cache.generation(user_id)
+    try:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    except ConnectionFailure:
+        # Database down: keep authenticating with the last principal seen, never after an invalidation
+        cached = principal_cache.snapshot(user_id)
+        if cached is None or cached is _USER_NOT_FOUND:
+            raise
+        return dict(cached)
+    principal_cache.set(user_id, user if user is not None else _USER_NOT_FOUND, generation=generation)
+    return dict(user) if user is not None else None
+
+class LocalSocketTransport:
+    """Invalidation transport between the workers of one host.
+
+    Every worker binds a Unix datagram socket named after its pid in a
+    shared directory and sends each message to the other sockets found
+    there; sockets left by dead workers are removed on the first refused send.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        self._socket = None
+        self.dropped = 0
+
+    def start(self, on_message):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        self._socket.setblocking(False)
+
+        def readable():
+            while True:
+                try:
+                    data = self._socket.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    return
+                try:
+                    on_message(json.loads(data))
+                except Exception as e:
+                    logger.warning(f"Invalid invalidation message ignored: {e}")
+
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), readable)
+
+    def publish(self, message: dict):
+        if self._socket is None:
+            return
+        data = dumps_json(message)
+        for name in os.listdir(self.directory):
+            peer = os.path.join(self.directory, name)
+            if peer == self.path or not name.endswith(".sock"):
+                continue
+            try:
+                self._socket.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError) as e:
+                self.dropped += 1
+                logger.warning(f"Invalidation not delivered to {name}: {e}")
+
+    async def stop(self):
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+class MongoChangeStreamTransport:
+    """Invalidation transport through MongoDB, for workers on several hosts.
+
+    Messages are inserted into the ``cache_events`` collection (expired by a
+    TTL index) and every worker follows it with a change stream, which
+    requires a replica set (a single-node one is enough). The resume token is
+    kept so a dropped stream resumes without missing events.
+    """
+
+    name = "mongo"
+
+    def __init__(self):
+        self._task = None
+        self._resume_token = None
+        self.dropped = 0
+
+    def start(self, on_message):
+        self._task = asyncio.create_task(self._watch(on_message))
+
+    def publish(self, message: dict):
+        async def insert():
+            await db.cache_events.insert_one({**message, "created_at": datetime.now(timezone.utc)})
+        if not task_supervisor.submit_nowait("invalidation.publish", insert):
+            self.dropped += 1
+
+    async def _watch(self, on_message):
+        delay = 1.0
+        while True:
+            try:
+                async with db.cache_events.watch([{"$match": {"operationType": "insert"}}],
+                                                 resume_after=self._resume_token) as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        on_message(change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Invalidation change stream interrupted, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+class InvalidationBus:
+    """Broadcasts "collection X / key Y changed" to the other workers.
+
+    Changes are applied locally by ``notify_change`` and sent through the
+    configured transport; a worker ignores the messages it sent itself.
+    Without a transport (single worker) publishing is a no-op.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.published = 0
+        self.received = 0
+
+    def start(self):
+        if self.transport is not None:
+            self.transport.start(self._receive)
+
+    async def stop(self):
+        if self.transport is not None:
+            await self.transport.stop()
+
+    def publish(self, change: dict):
+        if self.transport is None:
+            return
+        self.transport.publish({**change, "origin": self.origin})
+        self.published += 1
+
+    def _receive(self, message: dict):
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        apply_change(message, local=False)
+
+    def stats(self) -> dict:
+        return {
+            "transport": self.transport.name if self.transport is not None else None,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.transport.dropped if self.transport is not None else 0,
+        }
+
+def create_invalidation_bus() -> InvalidationBus:
+    transport = INVALIDATION_BUS
+    if READ_MODEL and transport == "none":
+        # Only the writer publishes the shared read models: writes served by other workers must reach it
+        logger.warning("READ_MODEL=1 requires an invalidation bus, using the local transport")
+        transport = "local"
+    if transport == "local":
+        return InvalidationBus(LocalSocketTransport(INVALIDATION_SOCKET_DIR))
+    if transport == "mongo":
+        return InvalidationBus(MongoChangeStreamTransport())
+    return InvalidationBus(None)
+
+invalidation_bus = create_invalidation_bus()
+
+class SharedReadModel:
+    """Read models kept in ``multiprocessing.shared_memory``, one copy per host.
+
+    Each segment starts with a header (sequence, epoch, payload length, write
+    time). A single writer, the worker holding an exclusive ``flock`` on the
+    lock file, rewrites a payload in place seqlock-style: the sequence is odd
+    while the payload changes and even once it is complete. Readers copy what
+    they need straight out of the segment and retry if the sequence moved,
+    so they never lock. The other workers keep trying the lock and the first
+    to get it takes over when the writer exits. Segments outlive the workers
+    and are reused by the next ones.
+    """
+
+    HEADER = struct.Struct("<QQQd")
+    # Rankings index entry: user id, position in the ranking, competition rank
+    RANK_INDEX = struct.Struct("<40sII")
+
+    def __init__(self, prefix: str, capacities: dict):
+        self.prefix = prefix
+        self.capacities = capacities
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"{prefix}.lock")
+        self.is_writer = False
+        self._lock_file = None
+        self._segments = {}
+        self._epoch = secrets.randbits(63)
+        self._payloads = {}
+        self._counters = {"reads": 0, "retries": 0, "fallbacks": 0, "writes": 0, "oversized": 0}
+
+    def start(self):
+        for name, capacity in self.capacities.items():
+            segment_name = f"{self.prefix}_{name}"
+            try:
+                segment = shared_memory.SharedMemory(name=segment_name, create=True, size=self.HEADER.size + capacity)
+            except FileExistsError:
+                segment = shared_memory.SharedMemory(name=segment_name)
+            # Attached segments must survive this worker: keep the resource tracker from unlinking them
+            resource_tracker.unregister(segment._name, "shared_memory")
+            self._segments[name] = segment
+        self.try_become_writer()
+
+    def try_become_writer(self) -> bool:
+        if self.is_writer:
+            return True
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.is_writer = True
+        logger.info(f"This worker (pid {os.getpid()}) writes the shared read models")
+        return True
+
+    def close(self):
+        for segment in self._segments.values():
+            try:
+                segment.close()
+            except BufferError:
+                pass
+        self._segments = {}
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.is_writer = False
+
+    def write(self, name: str, payload: bytes) -> bool:
+        buf = self._segments[name].buf
+        capacity = len(buf) - self.HEADER.size
+        stored = True
+        if len(payload) > capacity:
+            # Readers then fall back to their own path rather than serve outdated data
+            logger.error(f"Read model {name} needs {len(payload)} bytes, only {capacity} available")
+            self._counters["oversized"] += 1
+            payload, stored = b"", False
+        sequence = struct.unpack_from("<Q", buf, 0)[0]
+        if sequence % 2:
+            sequence += 1  # a writer died mid-update
+        struct.pack_into("<Q", buf, 0, sequence + 1)
+        buf[self.HEADER.size:self.HEADER.size + len(payload)] = payload
+        struct.pack_into("<QQd", buf, 8, self._epoch, len(payload), time.time())
+        struct.pack_into("<Q", buf, 0, sequence + 2)
+        self._counters["writes"] += 1
+        return stored
+
+    def read(self, name: str, extract):
+        """Run ``extract(payload view, (sequence, epoch, written_at))`` on a consistent snapshot.
+
+        ``extract`` must copy what it keeps; None means no usable payload.
+        """
+        segment = self._segments.get(name)
+        if segment is None:
+            return None
+        buf = segment.buf
+        self._counters["reads"] += 1
+        for _ in range(READ_MODEL_READ_RETRIES):
+            sequence, epoch, length, written_at = self.HEADER.unpack_from(buf, 0)
+            if sequence % 2 == 0:
+                if length == 0:
+                    return None
+                try:
+                    with buf[self.HEADER.size:self.HEADER.size + length] as view:
+                        result = extract(view, (sequence, epoch, written_at))
+                except (struct.error, ValueError, IndexError):
+                    result = None
+                else:
+                    if struct.unpack_from("<Q", buf, 0)[0] == sequence:
+                        return result
+            self._counters["retries"] += 1
+        self._counters["fallbacks"] += 1
+        return None
+
+    def payload(self, name: str) -> Optional[dict]:
+        """Response payload of a JSON read model, rebuilt locally only when the writer changed it"""
+        segment = self._segments.get(name)
+        if segment is None:
+            return None
+        cached = self._payloads.get(name)
+        if cached is not None and cached[0] == struct.unpack_from("<Q", segment.buf, 0)[0]:
+            return cached[1]
+        snapshot = self.read(name, lambda view, version: (bytes(view), version))
+        if snapshot is None:
+            return None
+        body, (sequence, epoch, written_at) = snapshot
+        payload = {
+            "etag": f'"{name}-{epoch:x}-{sequence}"',
+            "last_modified": formatdate(written_at, usegmt=True),
+            "modified_at": int(written_at),
+            "next_cursor": None,
+            **compress_variants(body),
+        }
+        self._payloads[name] = (sequence, payload)
+        return payload
+
+    @classmethod
+    def encode_rankings(cls, entries: List[dict]) -> bytes:
+        """Count, entry offsets, id index sorted by id, then the JSON entries separated by commas"""
+        pieces, offsets, position = [], [], 0
+        for entry in entries:
+            offsets.append(position)
+            piece = dumps_json(project_user(entry) | {"rang": entry["rang"]}) + b","
+            pieces.append(piece)
+            position += len(piece)
+        offsets.append(position)
+        index = sorted((entry["id"].encode(), number, entry["rang"]) for number, entry in enumerate(entries))
+        return b"".join([
+            struct.pack("<I", len(entries)),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            b"".join(cls.RANK_INDEX.pack(*item) for item in index),
+            *pieces,
+        ])
+
+    @classmethod
+    def _rankings_slice(cls, view, start: int, stop: int) -> tuple:
+        count = struct.unpack_from("<I", view, 0)[0]
+        blob_at = 4 + 4 * (count + 1) + cls.RANK_INDEX.size * count
+        start, stop = max(0, start), min(stop, count)
+        if start >= stop:
+            return count, b"[]"
+        begin, end = struct.unpack_from("<I", view, 4 + 4 * start)[0], struct.unpack_from("<I", view, 4 + 4 * stop)[0]
+        # The last entry of the slice is followed by a comma, replaced by the closing bracket
+        return count, b"[" + bytes(view[blob_at + begin:blob_at + end - 1]) + b"]"
+
+    @classmethod
+    def _rankings_find(cls, view, user_id: str) -> Optional[tuple]:
+        count = struct.unpack_from("<I", view, 0)[0]
+        index_at = 4 + 4 * (count + 1)
+        key = user_id.encode()[:40].ljust(40, b"\0")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(view[index_at + middle * cls.RANK_INDEX.size:index_at + middle * cls.RANK_INDEX.size + 40]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count:
+            entry_id, position, rank = cls.RANK_INDEX.unpack_from(view, index_at + low * cls.RANK_INDEX.size)
+            if entry_id == key:
+                return position, rank
+        return None
+
+    def rankings_page(self, limit: int, offset: int) -> Optional[bytes]:
+        result = self.read("rankings", lambda view, _: self._rankings_slice(view, offset, offset + limit))
+        return result[1] if result is not None else None
+
+    def rankings_around(self, user_id: str, radius: int) -> Optional[tuple]:
+        """(rank or None, total, JSON entries) around a member; None when the model is unavailable"""
+        def extract(view, _):
+            found = self._rankings_find(view, user_id)
+            if found is None:
+                return None, struct.unpack_from("<I", view, 0)[0], b"[]"
+            position, rank = found
+            total, entries = self._rankings_slice(view, position - radius, position + radius + 1)
+            return rank, total, entries
+        return self.read("rankings", extract)
 
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    def stats(self) -> dict:
+        return {
+            "writer": self.is_writer,
+            "segments": {name: len(segment.buf) for name, segment in self._segments.items()},
+            **self._counters,
+        }
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token invalide")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+read_model = SharedReadModel(
+    f"tcs_{os.environ.get('DB_NAME', 'default')}",
+    {"rankings": READ_MODEL_SIZE_MB * 1024 * 1024, "achievements": 1024 * 1024, "training_schedule": 1024 * 1024}
+) if READ_MODEL else None
+
+def schedule_read_model_publish(name: str):
+    if read_model is not None and read_model.is_writer:
+        task_supervisor.submit_nowait(f"read_model.{name}", publish_read_model, name, key=f"read_model.{name}")
+
+async def publish_read_model(name: str):
+    if name == "rankings":
+        entries = leaderboard.top(len(leaderboard))
+        payload = await asyncio.to_thread(SharedReadModel.encode_rankings, entries)
+    else:
+        adapter = ACHIEVEMENTS_ADAPTER if name == "achievements" else TRAINING_SCHEDULE_ADAPTER
+        docs = await db[name].find({}, {"_id": 0}).to_list(100)
+        payload = adapter.dump_json(adapter.validate_python(docs))
+    read_model.write(name, payload)
+
+def ranking_page(limit: int, offset: int) -> Optional[bytes]:
+    """JSON page of the all-time ranking, from the shared read model or this worker's leaderboard"""
+    if read_model is not None:
+        page = read_model.rankings_page(limit, offset)
+        if page is not None:
+            return page
+    if leaderboard.ready:
+        return dumps_json([project_user(user) | {"rang": user["rang"]} for user in leaderboard.top(limit, offset)])
+    return None
+
+def ranking_neighbourhood(user_id: str, radius: int) -> Optional[dict]:
+    """Rank, total and neighbours of a member; None while no ranking is available"""
+    if read_model is not None:
+        found = read_model.rankings_around(user_id, radius)
+        if found is not None:
+            rank, total, entries = found
+            return {"rang": rank, "total": total, "classement": orjson.loads(entries) if orjson else json.loads(entries)}
+    if leaderboard.ready:
+        return {
+            "rang": leaderboard.rank(user_id),
+            "total": len(leaderboard),
+            "classement": [project_user(user) | {"rang": user["rang"]} for user in leaderboard.around(user_id, radius)]
+        }
+    return None
+
+def apply_change(change: dict, local: bool):
+    """Drop what this worker derived from a changed document"""
+    collection, key, data = change["collection"], change.get("key"), change.get("data") or {}
+    if collection == "users":
+        principal_cache.invalidate(key)
+        mark_leaderboard_dirty(key)
+        if local and data.get("ranking"):
+            # Period boards live in Mongo: the worker that made the change refreshes them
+            mark_leaderboards_stale()
+    elif collection == "revocations":
+        _record_revocation(key, data["at"])
+    else:
+        domain_cache.invalidate(collection)
+        if collection in ("achievements", "training_schedule"):
+            schedule_read_model_publish(collection)
+        if collection == "matches" and "score" in data:
+            publish_score(data["score"])
+
+def notify_change(collection: str, key: Optional[str] = None, data: Optional[dict] = None):
+    """Apply a change to this worker's caches and broadcast it to the others"""
+    change = {"collection": collection, "key": key, "data": data}
+    apply_change(change, local=True)
+    invalidation_bus.publish(change)
+
+def publish_score(match: dict):
+    topics = ["matches", f"match:{match['id']}"]
+    if match.get("tournament_id"):
+        topics.append(f"tournament:{match['tournament_id']}")
+    event_hub.publish(topics, "score", match["id"], match)
+
+def invalidate_user(user_id: str, ranking: bool = False):
+    """``ranking`` when the licence changed or the account is gone; points go through record_points_events"""
+    notify_change("users", user_id, {"ranking": True} if ranking else None)
+
+async def get_current_principal(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    # Sub-requests of /batch and journal replays reuse the principal authenticated beforehand
+    principal = request.scope.get("batch_principal")
+    if principal is not None:
+        return principal
+    if credentials is None:
+        raise HTTPException(status_code=403, detail="Not authenticated")
+    return await authenticate_access_token(credentials.credentials)
+
+async def authenticate_access_token(token: str) -> dict:
+    """Authorize from the signed claims alone, without reading the user document"""
+    payload = decode_token(token, "access")
+    user_id = payload["sub"]
+    if payload.get("iat", 0) < _revoked_before.get(user_id, 0):
+        raise HTTPException(status_code=401, detail="Token révoqué")
+    if "role" not in payload:
+        user = await load_user(user_id)
         if user is None:
             raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-        return user
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expiré")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Token invalide")
+        return {"id": user_id, "role": user.get("role", "user"), "est_licencie": user.get("est_licencie", False)}
+    return {"id": user_id, "role": payload["role"], "est_licencie": payload.get("est_licencie", False)}
 
-async def get_current_admin(current_user: dict = Depends(get_current_user)):
+async def get_current_user(principal: dict = Depends(get_current_principal)):
+    user = await load_user(principal["id"])
+    if user is None:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    return user
+
+async def get_current_admin(current_user: dict = Depends(get_current_principal)):
     if current_user.get("role") not in ["admin", "referent"]:
         raise HTTPException(status_code=403, detail="Accès non autorisé")
     return current_user
 
-async def get_current_referent(current_user: dict = Depends(get_current_user)):
+async def get_current_referent(current_user: dict = Depends(get_current_principal)):
     if current_user.get("role") != "referent":
         raise HTTPException(status_code=403, detail="Accès réservé aux référents")
     return current_user
 
+def email_index_missing() -> bool:
+    """True when the unique users_email index could not be built (duplicates already stored)"""
+    return "users.users_email" in index_report["missing"]
+
+async def email_taken(email: str, except_user_id: Optional[str] = None) -> bool:
+    query = {"email": email}
+    if except_user_id is not None:
+        query["id"] = {"$ne": except_user_id}
+    return await db.users.find_one(query, {"_id": 1}) is not None
+
+async def insert_user(user_doc: dict):
+    # users_email rejects duplicates; without it the check has to be done by hand
+    if email_index_missing() and await email_taken(user_doc["email"]):
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
+
 @api_router.post("/auth/register")
 async def register(user_data: UserRegister):
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email déjà utilisé")
-    
     import uuid
     user_id = str(uuid.uuid4())
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     
     user_doc = {
         "id": user_id,
@@ -409,9 +3072,12 @@ async def register(user_data: UserRegister):
         "date_creation": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(user_doc)
+    await insert_user(user_doc)
+    invalidate_user(user_id)
     
-    asyncio.create_task(send_email_async(
+    await task_supervisor.submit(
+        "email.admin_notification",
+        email_outbox.enqueue,
         ADMIN_EMAIL,
         f"Nouveau membre: {user_data.prenom} {user_data.nom}",
         f"""
@@ -422,10 +3088,9 @@ async def register(user_data: UserRegister):
         <p><strong>Licencié:</strong> {'Oui' if user_data.est_licencie else 'Non'}</p>
         <p><strong>Date d'inscription:</strong> {datetime.now(timezone.utc).strftime('%d/%m/%Y %H:%M')}</p>
         """
-    ))
+    )
     
-    token = create_access_token({"sub": user_id})
-    return {"token": token, "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
+    return {**create_user_tokens(user_doc), "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
 
 @api_router.post("/auth/register-referent")
 async def register_referent(referent_data: ReferentRegister):
@@ -442,7 +3107,7 @@ async def register_referent(referent_data: ReferentRegister):
     
     import uuid
     pending_id = str(uuid.uuid4())
-    hashed_password = pwd_context.hash(referent_data.password)
+    hashed_password = await password_hasher.hash(referent_data.password)
     
     pending_doc = {
         "id": pending_id,
@@ -457,7 +3122,7 @@ async def register_referent(referent_data: ReferentRegister):
     
     await db.pending_referents.insert_one(pending_doc)
     
-    await send_email_async(
+    await email_outbox.enqueue(
         referent_data.email,
         "Code de vérification - Référent TCS Suzini",
         f"""
@@ -510,20 +3175,30 @@ async def verify_referent(verify_data: ReferentVerify):
         "date_creation": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(user_doc)
+    await insert_user(user_doc)
+    invalidate_user(user_id)
     await db.pending_referents.delete_one({"email": verify_data.email})
     
-    token = create_access_token({"sub": user_id})
-    return {"token": token, "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
+    return {**create_user_tokens(user_doc), "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
 
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not pwd_context.verify(credentials.password, user["password_hash"]):
+    if not user or not await password_hasher.verify(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
-    token = create_access_token({"sub": user["id"]})
-    return {"token": token, "user": User(**{k: v for k, v in user.items() if k != "password_hash"})}
+    return {**create_user_tokens(user), "user": User(**{k: v for k, v in user.items() if k != "password_hash"})}
+
+@api_router.post("/auth/refresh")
+async def refresh_access_token(request: RefreshTokenRequest):
+    payload = decode_token(request.refresh_token, "refresh")
+    # Claims are re-derived from the stored user, so demotions apply at the next refresh
+    user = await load_user(payload["sub"])
+    if user is None:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    if payload.get("iat", 0) < user.get("tokens_valid_after", 0):
+        raise HTTPException(status_code=401, detail="Session expirée, veuillez vous reconnecter")
+    return create_user_tokens(user)
 
 @api_router.post("/auth/forgot-password")
 async def forgot_password(request: ForgotPasswordRequest):
@@ -531,7 +3206,7 @@ async def forgot_password(request: ForgotPasswordRequest):
     if not user:
         return {"message": "Si l'email existe, un lien de réinitialisation a été envoyé"}
     
-    reset_token = create_access_token({"sub": user["id"], "type": "reset"})
+    reset_token = create_access_token({"sub": user["id"], "type": "reset"}, RESET_TOKEN_EXPIRE_MINUTES)
     
     reset_link = f"{FRONTEND_URL}/reset-password?token={reset_token}"
     
@@ -699,7 +3374,7 @@ async def forgot_password(request: ForgotPasswordRequest):
     </html>
     """
     
-    await send_email_async(
+    await email_outbox.enqueue(
         request.email,
         "Réinitialisation de votre mot de passe - TCS de Suzini",
         html_content
@@ -714,24 +3389,25 @@ async def reset_password(request: ResetPasswordRequest):
         if payload.get("type") != "reset":
             raise HTTPException(status_code=400, detail="Token invalide")
         user_id = payload.get("sub")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=400, detail="Token invalide ou expiré")
     
-    hashed_password = pwd_context.hash(request.new_password)
+    hashed_password = await password_hasher.hash(request.new_password)
     await db.users.update_one(
         {"id": user_id},
-        {"$set": {"password_hash": hashed_password}}
+        {"$set": {"password_hash": hashed_password, "tokens_valid_after": time.time()}}
     )
+    invalidate_user(user_id)
+    revoke_tokens(user_id)
     
     return {"message": "Mot de passe réinitialisé avec succès"}
 
-@api_router.get("/users/me", response_model=UserProfile)
-async def get_my_profile(current_user: dict = Depends(get_current_user)):
-    achievements = await db.user_achievements.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(100)
+async def load_achievement_details(user_id: str, loaders: Loaders) -> List[dict]:
+    achievements = await db.user_achievements.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+    catalog = await loaders.achievements.load_many([ua["achievement_id"] for ua in achievements])
     
     achievement_details = []
-    for ua in achievements:
-        achievement = await db.achievements.find_one({"id": ua["achievement_id"]}, {"_id": 0})
+    for ua, achievement in zip(achievements, catalog):
         if achievement:
             achievement_details.append({
                 "id": achievement["id"],
@@ -740,10 +3416,147 @@ async def get_my_profile(current_user: dict = Depends(get_current_user)):
                 "icone": achievement["icone"],
                 "date_obtenu": ua["date_obtenu"]
             })
-    
+    return achievement_details
+
+@api_router.get("/users/me", response_model=UserProfile)
+async def get_my_profile(current_user: dict = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
+    achievement_details = await load_achievement_details(current_user["id"], loaders)
     profile = UserProfile(**current_user, achievements=achievement_details)
     return profile
 
+async def load_user_rank(user: dict) -> dict:
+    neighbourhood = ranking_neighbourhood(user["id"], 0)
+    if neighbourhood is not None:
+        return {"rang": neighbourhood["rang"], "total": neighbourhood["total"], "points": user.get("points", 0)}
+    if not user.get("est_licencie"):
+        return {"rang": None, "total": None, "points": user.get("points", 0)}
+    ahead, total = await asyncio.gather(
+        db.users.count_documents({"est_licencie": True, "points": {"$gt": user.get("points", 0)}}),
+        db.users.count_documents({"est_licencie": True})
+    )
+    return {"rang": ahead + 1, "total": total, "points": user.get("points", 0)}
+
+async def load_active_tournaments(today: str) -> List[dict]:
+    return await domain_cache.get_or_load(
+        "tournaments", ("dashboard", today),
+        lambda: db.tournaments.find({"date_fin": {"$gte": today}}, {"_id": 0}).sort([("date_debut", 1), ("id", 1)]).to_list(100)
+    )
+
+async def load_upcoming_matches(today: str) -> dict:
+    async def load():
+        matches, total = await asyncio.gather(
+            db.matches.find({"date": {"$gte": today}}, {"_id": 0}).sort([("date", 1), ("id", 1)]).to_list(DASHBOARD_MATCHES),
+            db.matches.count_documents({"date": {"$gte": today}})
+        )
+        return {"total": total, "prochains": matches}
+    return await domain_cache.get_or_load("matches", ("dashboard", today), load)
+
+async def call_app(method: str, path: str, query: str = "", headers: Optional[list] = None, body: bytes = b"",
+                   principal: Optional[dict] = None, **scope_extra) -> tuple:
+    """Run one request through the application in-process; returns (status, lower-cased headers, body)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(key.encode(), value.encode()) for key, value in headers or []],
+        "client": None,
+        "server": None,
+        **scope_extra,
+    }
+    if principal is not None:
+        scope["batch_principal"] = principal
+    start = {}
+    chunks = []
+    received = False
+    
+    async def receive():
+        # The body is delivered once; afterwards the caller never disconnects, so block like an idle client
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+    
+    await app(scope, receive, send)
+    response_headers = {key.decode().lower(): value.decode() for key, value in start.get("headers", [])}
+    return start.get("status", 500), response_headers, b"".join(chunks)
+
+async def run_batch_subrequest(sub_request: BatchSubRequest, principal: Optional[dict]) -> bytes:
+    """Run one GET through the application in-process and encode its envelope entry.
+
+    JSON bodies are embedded as they were produced, without being parsed again.
+    """
+    path, _, query = sub_request.path.partition("?")
+    try:
+        status, headers, body = await asyncio.wait_for(
+            call_app("GET", f"/api{path}", query, principal=principal), BATCH_SUBREQUEST_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Batch sub-request {sub_request.path} timed out")
+        status, headers, body = 504, {"content-type": "application/json"}, dumps_json({"detail": "Délai dépassé"})
+    except Exception as e:
+        logger.error(f"Batch sub-request {sub_request.path} failed: {e}")
+        status, headers, body = 500, {"content-type": "application/json"}, dumps_json({"detail": "Erreur interne"})
+    
+    if not body:
+        body = b"null"
+    elif not headers.get("content-type", "").startswith("application/json"):
+        body = dumps_json(body.decode(errors="replace"))
+    envelope = {
+        "id": sub_request.id,
+        "path": sub_request.path,
+        "status": status,
+        "headers": {key: headers[key] for key in ("etag", "last-modified", "x-next-cursor") if key in headers},
+    }
+    return dumps_json(envelope)[:-1] + b',"body":' + body + b"}"
+
+@api_router.post("/batch")
+async def batch(batch_request: BatchRequest, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Execute several GET requests against the API in one round trip.
+
+    The bearer token is verified once and shared by every sub-request; the
+    sub-requests run concurrently and their responses come back in order.
+    """
+    if len(batch_request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Maximum {BATCH_MAX_REQUESTS} requêtes par lot")
+    for sub_request in batch_request.requests:
+        path = sub_request.path.split("?")[0]
+        if not path.startswith("/") or path.rstrip("/") == "/batch" or BATCH_STREAMING_PATHS.match(path):
+            raise HTTPException(status_code=400, detail=f"Chemin invalide: {sub_request.path}")
+    
+    principal = await authenticate_access_token(credentials.credentials) if credentials else None
+    entries = await asyncio.gather(*(run_batch_subrequest(sub_request, principal) for sub_request in batch_request.requests))
+    return Response(content=b'{"responses":[' + b",".join(entries) + b"]}", media_type="application/json")
+
+@api_router.get("/dashboard")
+async def get_dashboard(current_user: dict = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
+    """Everything the dashboard page shows, authenticated once and loaded concurrently"""
+    today = datetime.now(timezone.utc).date().isoformat()
+    achievement_details, tournaments, matches, rank = await asyncio.gather(
+        load_achievement_details(current_user["id"], loaders),
+        load_active_tournaments(today),
+        load_upcoming_matches(today),
+        load_user_rank(current_user)
+    )
+    return {
+        "profil": UserProfile(**current_user, achievements=achievement_details).model_dump(),
+        "tournois_actifs": {"total": len(tournaments), "tournois": tournaments},
+        "prochains_matchs": matches,
+        "classement": rank
+    }
+
 @api_router.patch("/users/me")
 async def update_my_profile(update_data: dict, current_user: dict = Depends(get_current_user)):
     allowed_fields = ["nom", "prenom", "type_licence", "est_licencie"]
@@ -756,6 +3569,9 @@ async def update_my_profile(update_data: dict, current_user: dict = Depends(get_
         {"id": current_user["id"]},
         {"$set": update_fields}
     )
+    invalidate_user(current_user["id"], ranking="est_licencie" in update_fields)
+    if "est_licencie" in update_fields:
+        revoke_tokens(current_user["id"])
     
     user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "password_hash": 0})
     return User(**user)
@@ -764,12 +3580,16 @@ async def update_my_profile(update_data: dict, current_user: dict = Depends(get_
 async def delete_my_account(current_user: dict = Depends(get_current_user)):
     await db.users.delete_one({"id": current_user["id"]})
     await db.user_achievements.delete_many({"user_id": current_user["id"]})
+    invalidate_user(current_user["id"], ranking=True)
+    revoke_tokens(current_user["id"])
     return {"message": "Compte supprimé avec succès"}
 
 @api_router.get("/referent/users", response_model=List[User])
-async def get_all_users(current_user: dict = Depends(get_current_referent)):
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    return [User(**user) for user in users]
+async def get_all_users(cursor: Optional[str] = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                        current_user: dict = Depends(get_current_referent)):
+    users, next_cursor = await fetch_page("users", "date_creation", 1, cursor, limit,
+                                          projection={"_id": 0, "password_hash": 0})
+    return fast_json_response(project_user, users, {"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 @api_router.patch("/referent/users/{user_id}")
 async def update_user(user_id: str, user_data: dict, current_user: dict = Depends(get_current_referent)):
@@ -781,17 +3601,164 @@ async def update_user(user_id: str, user_data: dict, current_user: dict = Depend
     
     if not update_data:
         raise HTTPException(status_code=400, detail="Aucun champ valide à mettre à jour")
+    # Points feed the point events and the leaderboards: bools and floats are refused too
+    if "points" in update_data and type(update_data["points"]) is not int:
+        raise HTTPException(status_code=400, detail="Points invalides")
+    if "email" in update_data and email_index_missing() and await email_taken(update_data["email"], user_id):
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
     
-    result = await db.users.update_one(
-        {"id": user_id},
-        {"$set": update_data}
-    )
+    try:
+        previous = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$set": update_data},
+            projection={"_id": 0, "password_hash": 0}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
-    return User(**user)
+    if "points" in update_data and update_data["points"] != previous.get("points", 0):
+        await record_points_events([(user_id, update_data["points"] - previous.get("points", 0), "referent")])
+    invalidate_user(user_id, ranking="est_licencie" in update_data)
+    if "est_licencie" in update_data:
+        revoke_tokens(user_id)
+    
+    return User(**{**previous, **update_data})
+
+IMPORT_EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+IMPORT_TRUE_VALUES = {"true", "1", "oui", "yes", "vrai", "o"}
+IMPORT_FALSE_VALUES = {"false", "0", "non", "no", "faux", "n"}
+
+def validate_import_chunk(chunk, first_line: int, seen_emails: set):
+    """Validate one batch of roster rows with column-wide pandas operations.
+
+    Returns (valid rows as dicts, errors as {"ligne", "email", "erreurs"}).
+    """
+    import pandas as pd
+    df = chunk.astype(object).where(chunk.notna(), "")
+    df = df.reindex(columns=sorted(set(df.columns) | {"email", "nom", "prenom", "type_licence", "est_licencie"}), fill_value="")
+    df = df.astype(str).apply(lambda column: column.str.strip())
+    df["email"] = df["email"].str.lower()
+    df["type_licence"] = df["type_licence"].str.lower().replace("", "competition")
+    licencie = df["est_licencie"].str.lower().replace("", "true")
+    
+    checks = {
+        "email manquant": df["email"] == "",
+        "email invalide": (df["email"] != "") & ~df["email"].str.match(IMPORT_EMAIL_PATTERN),
+        "nom manquant": df["nom"] == "",
+        "prenom manquant": df["prenom"] == "",
+        "type_licence invalide": ~df["type_licence"].isin(LICENCE_TYPES),
+        "est_licencie invalide": ~licencie.isin(IMPORT_TRUE_VALUES | IMPORT_FALSE_VALUES),
+        "email en double dans le fichier": df["email"].duplicated(keep="first") | df["email"].isin(seen_emails),
+    }
+    failed = pd.DataFrame(checks)
+    has_error = failed.any(axis=1)
+    df["est_licencie"] = licencie.isin(IMPORT_TRUE_VALUES)
+    df["ligne"] = range(first_line, first_line + len(df))
+    
+    errors = [
+        {"ligne": int(df.at[index, "ligne"]), "email": df.at[index, "email"], "erreurs": list(failed.columns[failed.loc[index]])}
+        for index in df.index[has_error]
+    ]
+    valid = df.loc[~has_error, ["ligne", "email", "nom", "prenom", "type_licence", "est_licencie"]].to_dict("records")
+    seen_emails.update(df["email"][df["email"] != ""])
+    return valid, errors
+
+async def upsert_imported_members(rows: List[dict], report: dict):
+    """Create or update one validated batch with a single bulk_write"""
+    import uuid
+    emails = [row["email"] for row in rows]
+    # Imported emails are lowercased; older accounts may not be, hence the case-insensitive match
+    existing = {
+        user["email"].lower(): user["id"]
+        for user in await db.users.find({"email": {"$in": emails}}, {"_id": 0, "id": 1, "email": 1}).collation(EMAIL_COLLATION).to_list(None)
+    }
+    new_rows = [row for row in rows if row["email"] not in existing]
+    passwords = [secrets.token_urlsafe(9) for _ in new_rows]
+    hashes = await password_hasher.hash_many(passwords)
+    for row, password, password_hash in zip(new_rows, passwords, hashes):
+        row.update(id=str(uuid.uuid4()), password=password, password_hash=password_hash)
+    
+    now = datetime.now(timezone.utc).isoformat()
+    operations = []
+    for row in rows:
+        fields = {"nom": row["nom"], "prenom": row["prenom"], "type_licence": row["type_licence"],
+                  "est_licencie": bool(row["est_licencie"])}
+        if row["email"] in existing:
+            operations.append(UpdateOne({"id": existing[row["email"]]}, {"$set": fields}))
+            continue
+        on_insert = {"id": row["id"], "password_hash": row["password_hash"], "role": "user",
+                     "points": 0, "participations": 0, "date_creation": now}
+        operations.append(UpdateOne({"email": row["email"]}, {"$set": fields, "$setOnInsert": on_insert},
+                                    upsert=True, collation=EMAIL_COLLATION))
+    
+    failed = {}
+    try:
+        await db.users.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "erreur d'écriture") for error in e.details.get("writeErrors", [])}
+    
+    for index, row in enumerate(rows):
+        if index in failed:
+            report["erreurs"].append({"ligne": row["ligne"], "email": row["email"], "erreurs": [failed[index]]})
+            continue
+        if row["email"] in existing:
+            report["mis_a_jour"] += 1
+            invalidate_user(existing[row["email"]], ranking=True)
+        else:
+            report["crees"].append({"ligne": row["ligne"], "email": row["email"], "mot_de_passe_temporaire": row["password"]})
+            invalidate_user(row["id"], ranking=True)
+
+@api_router.post("/referent/import-members")
+async def import_members(file: UploadFile = File(...), format: Optional[str] = None,
+                         current_user: dict = Depends(get_current_referent)):
+    """Import a federation roster (CSV with a header line, or NDJSON) batch by batch"""
+    import pandas as pd
+    file_format = format or ("ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv")
+    if file_format == "csv":
+        reader = pd.read_csv(file.file, chunksize=IMPORT_BATCH_SIZE, dtype=str, keep_default_na=False, skipinitialspace=True)
+        first_line = 2
+    elif file_format == "ndjson":
+        reader = pd.read_json(file.file, lines=True, chunksize=IMPORT_BATCH_SIZE, dtype=False)
+        first_line = 1
+    else:
+        raise HTTPException(status_code=400, detail="Format non supporté (csv ou ndjson)")
+    
+    report = {"lignes": 0, "crees": [], "mis_a_jour": 0, "erreurs": []}
+    seen_emails = set()
+    while True:
+        try:
+            # Parsing reads the spooled upload from disk: keep it off the event loop
+            chunk = await asyncio.to_thread(next, reader, None)
+        except ValueError as e:
+            report["erreurs"].append({"ligne": first_line + report["lignes"], "email": None, "erreurs": [f"fichier illisible: {e}"]})
+            break
+        if chunk is None:
+            break
+        valid, errors = validate_import_chunk(chunk, first_line + report["lignes"], seen_emails)
+        report["lignes"] += len(chunk)
+        report["erreurs"].extend(errors)
+        if valid:
+            await upsert_imported_members(valid, report)
+    
+    report["erreurs"].sort(key=lambda error: error["ligne"])
+    return report
+
+@api_router.get("/referent/export/users")
+async def export_users(format: str = "csv", gzip: bool = False, current_user: dict = Depends(get_current_referent)):
+    cursor = db.users.find({}, {"_id": 0, "password_hash": 0}).sort([("date_creation", 1), ("id", 1)])
+    return export_response(cursor, USER_EXPORT_COLUMNS, format, gzip, "membres")
+
+@api_router.get("/referent/export/tournaments/{tournament_id}/participants")
+async def export_tournament_participants(tournament_id: str, format: str = "csv", gzip: bool = False,
+                                         current_user: dict = Depends(get_current_referent)):
+    tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0, "participants": 1})
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournoi non trouvé")
+    cursor = db.users.find({"id": {"$in": tournament.get("participants", [])}}, {"_id": 0, "password_hash": 0}).sort("id", 1)
+    return export_response(cursor, USER_EXPORT_COLUMNS, format, gzip, f"participants_{tournament_id}")
 
 @api_router.delete("/referent/users/{user_id}")
 async def delete_user(user_id: str, current_user: dict = Depends(get_current_referent)):
@@ -799,6 +3766,8 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_ref
         raise HTTPException(status_code=400, detail="Vous ne pouvez pas supprimer votre propre compte")
     
     result = await db.users.delete_one({"id": user_id})
+    invalidate_user(user_id, ranking=True)
+    revoke_tokens(user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     return {"message": "Utilisateur supprimé"}
@@ -814,17 +3783,109 @@ async def toggle_user_license(user_id: str, current_user: dict = Depends(get_cur
         {"id": user_id},
         {"$set": {"est_licencie": new_status}}
     )
+    invalidate_user(user_id, ranking=True)
+    revoke_tokens(user_id)
     
     return {"message": f"Statut de licence modifié", "est_licencie": new_status}
 
+@api_router.post("/referent/users/bulk")
+async def bulk_users(request: BulkRequest, current_user: dict = Depends(get_current_referent)):
+    """Operations: set_license {est_licencie}, toggle_license, update {fields}, delete"""
+    allowed_fields = ["nom", "prenom", "email", "type_licence", "est_licencie", "points", "participations"]
+    
+    # Without users_email the email changes are checked by hand, with one $in query for the batch
+    email_owners = None
+    if email_index_missing():
+        emails = {operation.data["email"] for operation in request.operations
+                  if operation.op == "update" and isinstance(operation.data.get("email"), str)}
+        email_owners = {}
+        if emails:
+            for doc in await db.users.find({"email": {"$in": list(emails)}}, {"_id": 0, "id": 1, "email": 1}).to_list(None):
+                email_owners.setdefault(doc["email"], set()).add(doc["id"])
+    
+    def build(operation: BulkOperation, user: Optional[dict]):
+        if operation.op == "set_license":
+            if not isinstance(operation.data.get("est_licencie"), bool):
+                raise HTTPException(status_code=400, detail="est_licencie doit être un booléen")
+            return UpdateOne({"id": operation.id}, {"$set": {"est_licencie": operation.data["est_licencie"]}}), {"id": operation.id}
+        if operation.op == "toggle_license":
+            new_status = not user.get("est_licencie", False)
+            return UpdateOne({"id": operation.id}, {"$set": {"est_licencie": new_status}}), {"id": operation.id, "est_licencie": new_status}
+        if operation.op == "update":
+            update_data = {k: v for k, v in operation.data.items() if k in allowed_fields}
+            if not update_data:
+                raise HTTPException(status_code=400, detail="Aucun champ valide à mettre à jour")
+            if "points" in update_data and type(update_data["points"]) is not int:
+                raise HTTPException(status_code=400, detail="Points invalides")
+            if email_owners is not None and "email" in update_data:
+                owners = email_owners.setdefault(update_data["email"], set())
+                if owners - {operation.id}:
+                    raise HTTPException(status_code=400, detail="Email déjà utilisé")
+                # Claimed for the rest of the batch
+                owners.add(operation.id)
+            return UpdateOne({"id": operation.id}, {"$set": update_data}), {"id": operation.id}
+        if operation.op == "delete":
+            if operation.id == current_user["id"]:
+                raise HTTPException(status_code=400, detail="Vous ne pouvez pas supprimer votre propre compte")
+            return DeleteOne({"id": operation.id}), {"id": operation.id}
+        raise HTTPException(status_code=400, detail=f"Opération inconnue: {operation.op}")
+    
+    results, applied = await run_bulk("users", request, build)
+    
+    deleted = [operation.id for operation, _ in applied if operation.op == "delete"]
+    if deleted:
+        await db.user_achievements.delete_many({"user_id": {"$in": deleted}})
+    points_events = [
+        (operation.id, operation.data["points"] - user.get("points", 0), "referent")
+        for operation, user in applied
+        if operation.op == "update" and "points" in operation.data and operation.data["points"] != user.get("points", 0)
+    ]
+    if points_events:
+        await record_points_events(points_events)
+    for operation, _ in applied:
+        licence_changed = operation.op != "update" or "est_licencie" in operation.data
+        invalidate_user(operation.id, ranking=licence_changed)
+        if licence_changed:
+            revoke_tokens(operation.id)
+    
+    return bulk_summary(results)
+
+ACHIEVEMENTS_ADAPTER = TypeAdapter(List[Achievement])
+TOURNAMENTS_ADAPTER = TypeAdapter(List[Tournament])
+MATCHES_ADAPTER = TypeAdapter(List[Match])
+NEWS_ADAPTER = TypeAdapter(List[News])
+TRAINING_SCHEDULE_ADAPTER = TypeAdapter(List[TrainingSchedule])
+
 @api_router.get("/achievements", response_model=List[Achievement])
-async def get_achievements():
-    achievements = await db.achievements.find({}, {"_id": 0}).to_list(100)
-    return achievements
+async def get_achievements(request: Request):
+    if read_model is not None and (payload := read_model.payload("achievements")) is not None:
+        return payload_response(request, payload)
+    async def load():
+        return await db.achievements.find({}, {"_id": 0}).to_list(100), None
+    return await cached_json_response(request, "achievements", "all", load, ACHIEVEMENTS_ADAPTER)
 
 @api_router.get("/tournaments", response_model=List[Tournament])
-async def get_tournaments():
-    tournaments = await db.tournaments.find({}, {"_id": 0}).sort("date_debut", -1).to_list(100)
+async def get_tournaments(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                          expand: Optional[str] = None, loaders: Loaders = Depends(get_loaders)):
+    if expand != "participants":
+        return await cached_json_response(
+            request, "tournaments", (cursor, limit), lambda: fetch_page("tournaments", "date_debut", -1, cursor, limit),
+            TOURNAMENTS_ADAPTER
+        )
+    tournaments, next_cursor = await domain_cache.get_or_load(
+        "tournaments", (cursor, limit), lambda: fetch_page("tournaments", "date_debut", -1, cursor, limit)
+    )
+    set_next_cursor(response, next_cursor)
+    # Cached documents are shared: expand copies
+    tournaments = [dict(tournament) for tournament in tournaments]
+    # One $in query for the participants of the whole page
+    members = await loaders.members.load_many({pid for t in tournaments for pid in t.get("participants", [])})
+    names = {m["id"]: m for m in members if m}
+    for tournament in tournaments:
+        tournament["participants_details"] = [
+            {"id": pid, "nom": names[pid]["nom"], "prenom": names[pid]["prenom"]}
+            for pid in tournament.get("participants", []) if pid in names
+        ]
     return tournaments
 
 @api_router.post("/tournaments", response_model=Tournament)
@@ -846,6 +3907,7 @@ async def create_tournament(tournament_data: TournamentCreate, current_user: dic
     }
     
     await db.tournaments.insert_one(tournament_doc)
+    notify_change("tournaments")
     return Tournament(**tournament_doc)
 
 @api_router.patch("/tournaments/{tournament_id}")
@@ -865,6 +3927,7 @@ async def update_tournament(tournament_id: str, tournament_data: TournamentCreat
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Tournoi non trouvé")
+    notify_change("tournaments")
     
     tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0})
     return Tournament(**tournament)
@@ -874,29 +3937,39 @@ async def register_tournament(tournament_id: str, current_user: dict = Depends(g
     if not current_user.get("est_licencie"):
         raise HTTPException(status_code=403, detail="Vous devez être licencié pour vous inscrire")
     
-    tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0})
-    if not tournament:
-        raise HTTPException(status_code=404, detail="Tournoi non trouvé")
-    
-    if current_user["id"] in tournament["participants"]:
-        raise HTTPException(status_code=400, detail="Vous êtes déjà inscrit à ce tournoi")
-    
-    if len(tournament["participants"]) >= tournament["max_participants"]:
-        raise HTTPException(status_code=400, detail="Le tournoi est complet")
-    
-    await db.tournaments.update_one(
-        {"id": tournament_id},
-        {"$push": {"participants": current_user["id"]}}
+    # Membership and capacity are checked by the filter itself, so concurrent sign-ups cannot over-book
+    tournament = await db.tournaments.find_one_and_update(
+        {
+            "id": tournament_id,
+            "participants": {"$ne": current_user["id"]},
+            "$expr": {"$lt": [{"$size": "$participants"}, {"$ifNull": ["$max_participants", 16]}]}
+        },
+        {"$push": {"participants": current_user["id"]}},
+        projection={"_id": 0, "nom": 1}
     )
+    if tournament is None:
+        existing = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0, "participants": 1})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Tournoi non trouvé")
+        if current_user["id"] in existing.get("participants", []):
+            raise HTTPException(status_code=400, detail="Vous êtes déjà inscrit à ce tournoi")
+        raise HTTPException(status_code=400, detail="Le tournoi est complet")
+    notify_change("tournaments")
     
-    await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"id": current_user["id"]},
-        {"$inc": {"participations": 1}}
+        {"$inc": {"participations": 1}},
+        projection={"_id": 0, "participations": 1},
+        return_document=ReturnDocument.AFTER
     )
+    invalidate_user(current_user["id"])
     
-    await check_and_award_achievements(current_user["id"])
+    if user is not None:
+        await check_and_award_achievements(current_user["id"], user.get("participations", 0))
     
-    asyncio.create_task(send_email_async(
+    await task_supervisor.submit(
+        "email.admin_notification",
+        email_outbox.enqueue,
         ADMIN_EMAIL,
         f"Inscription tournoi: {current_user['prenom']} {current_user['nom']}",
         f"""
@@ -906,14 +3979,15 @@ async def register_tournament(tournament_id: str, current_user: dict = Depends(g
         <p><strong>Tournoi:</strong> {tournament['nom']}</p>
         <p><strong>Date:</strong> {datetime.now(timezone.utc).strftime('%d/%m/%Y %H:%M')}</p>
         """
-    ))
+    )
     
     return {"message": "Inscription réussie"}
 
 @api_router.get("/matches", response_model=List[Match])
-async def get_matches():
-    matches = await db.matches.find({}, {"_id": 0}).sort("date", 1).to_list(100)
-    return matches
+async def get_matches(request: Request, cursor: Optional[str] = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1)):
+    return await cached_json_response(
+        request, "matches", (cursor, limit), lambda: fetch_page("matches", "date", 1, cursor, limit), MATCHES_ADAPTER
+    )
 
 @api_router.post("/matches", response_model=Match)
 async def create_match(match_data: MatchCreate, current_user: dict = Depends(get_current_referent)):
@@ -933,15 +4007,89 @@ async def create_match(match_data: MatchCreate, current_user: dict = Depends(get
     }
     
     await db.matches.insert_one(match_doc)
+    notify_change("matches")
     return Match(**match_doc)
 
+@api_router.patch("/matches/{match_id}/score", response_model=Match)
+async def update_match_score(match_id: str, score: MatchScoreUpdate, current_user: dict = Depends(get_current_referent)):
+    match = await db.matches.find_one_and_update(
+        {"id": match_id},
+        {"$set": {"score_a": score.score_a, "score_b": score.score_b}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if match is None:
+        raise HTTPException(status_code=404, detail="Match non trouvé")
+    # Other workers forward the score to their own spectators
+    notify_change("matches", match_id, {"score": project_match(match)})
+    return Match(**match)
+
+@api_router.get("/matches/live")
+async def stream_all_matches():
+    """Server-Sent Events: every score update, for pages that already listed the matches"""
+    return sse_response(event_hub.subscribe(["matches"]))
+
+@api_router.get("/matches/{match_id}/live")
+async def stream_match(match_id: str):
+    """Server-Sent Events: the match state on connect, then each score update"""
+    # Subscribed before reading the snapshot so no update falls in between
+    subscription = event_hub.subscribe([f"match:{match_id}"])
+    try:
+        match = await db.matches.find_one({"id": match_id}, {"_id": 0})
+    except Exception:
+        event_hub.unsubscribe(subscription)
+        raise
+    if match is None:
+        event_hub.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Match non trouvé")
+    snapshot = b"event: snapshot\ndata: " + dumps_json(project_match(match)) + b"\n\n"
+    return sse_response(subscription, snapshot)
+
+@api_router.get("/tournaments/{tournament_id}/live")
+async def stream_tournament(tournament_id: str):
+    """Server-Sent Events: the tournament matches on connect, then each score update"""
+    subscription = event_hub.subscribe([f"tournament:{tournament_id}"])
+    try:
+        matches = await db.matches.find({"tournament_id": tournament_id}, {"_id": 0}).sort("date", 1).to_list(500)
+    except Exception:
+        event_hub.unsubscribe(subscription)
+        raise
+    snapshot = b"event: snapshot\ndata: " + dumps_json([project_match(match) for match in matches]) + b"\n\n"
+    return sse_response(subscription, snapshot)
+
+@api_router.post("/matches/bulk")
+async def bulk_matches(request: BulkRequest, current_user: dict = Depends(get_current_referent)):
+    """Operations: create {MatchCreate}, update {fields}, delete"""
+    import uuid
+    
+    def build(operation: BulkOperation, match: Optional[dict]):
+        if operation.op == "create":
+            match_doc = {"id": str(uuid.uuid4()), **MatchCreate(**operation.data).model_dump(), "score_a": None, "score_b": None}
+            return InsertOne(match_doc), {"id": match_doc["id"]}
+        if operation.op == "update":
+            update_fields = {k: v for k, v in operation.data.items() if k in MatchCreate.model_fields}
+            if not update_fields:
+                raise HTTPException(status_code=400, detail="Aucun champ valide à mettre à jour")
+            return UpdateOne({"id": operation.id}, {"$set": update_fields}), {"id": operation.id}
+        if operation.op == "delete":
+            return DeleteOne({"id": operation.id}), {"id": operation.id}
+        raise HTTPException(status_code=400, detail=f"Opération inconnue: {operation.op}")
+    
+    results, _ = await run_bulk("matches", request, build)
+    return bulk_summary(results)
+
 @api_router.get("/news", response_model=List[News])
-async def get_news():
-    news_list = await db.news.find({}, {"_id": 0}).sort("date_publication", -1).to_list(100)
-    return news_list
+async def get_news(request: Request, cursor: Optional[str] = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1)):
+    return await cached_json_response(
+        request, "news", (cursor, limit), lambda: fetch_page("news", "date_publication", -1, cursor, limit), NEWS_ADAPTER
+    )
 
 @api_router.post("/news", response_model=News)
 async def create_news(news_data: NewsCreate, current_user: dict = Depends(get_current_referent)):
+    author = await load_user(current_user["id"])
+    if author is None:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    
     import uuid
     news_id = str(uuid.uuid4())
     
@@ -950,21 +4098,56 @@ async def create_news(news_data: NewsCreate, current_user: dict = Depends(get_cu
         "titre": news_data.titre,
         "contenu": news_data.contenu,
         "auteur_id": current_user["id"],
-        "auteur_nom": f"{current_user['prenom']} {current_user['nom']}",
+        "auteur_nom": f"{author['prenom']} {author['nom']}",
         "date_publication": datetime.now(timezone.utc).isoformat(),
         "image_url": news_data.image_url
     }
     
     await db.news.insert_one(news_doc)
+    notify_change("news")
     return News(**news_doc)
 
+@api_router.post("/news/bulk")
+async def bulk_news(request: BulkRequest, current_user: dict = Depends(get_current_referent)):
+    """Operations: create {NewsCreate}, update {fields}, delete"""
+    import uuid
+    author = await load_user(current_user["id"])
+    if author is None:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    
+    def build(operation: BulkOperation, news: Optional[dict]):
+        if operation.op == "create":
+            news_doc = {
+                "id": str(uuid.uuid4()),
+                **NewsCreate(**operation.data).model_dump(),
+                "auteur_id": current_user["id"],
+                "auteur_nom": f"{author['prenom']} {author['nom']}",
+                "date_publication": datetime.now(timezone.utc).isoformat()
+            }
+            return InsertOne(news_doc), {"id": news_doc["id"]}
+        if operation.op == "update":
+            update_fields = {k: v for k, v in operation.data.items() if k in NewsCreate.model_fields}
+            if not update_fields:
+                raise HTTPException(status_code=400, detail="Aucun champ valide à mettre à jour")
+            return UpdateOne({"id": operation.id}, {"$set": update_fields}), {"id": operation.id}
+        if operation.op == "delete":
+            return DeleteOne({"id": operation.id}), {"id": operation.id}
+        raise HTTPException(status_code=400, detail=f"Opération inconnue: {operation.op}")
+    
+    results, _ = await run_bulk("news", request, build)
+    return bulk_summary(results)
+
 @api_router.get("/training-schedule", response_model=List[TrainingSchedule])
-async def get_training_schedule():
+async def get_training_schedule(request: Request):
+    async def load():
+        return await db.training_schedule.find({}, {"_id": 0}).to_list(100), None
+    
     try:
         if db is None:
             return FALLBACK_DATA["training_schedule"]
-        schedules = await db.training_schedule.find({}, {"_id": 0}).to_list(100)
-        return schedules
+        if read_model is not None and (payload := read_model.payload("training_schedule")) is not None:
+            return payload_response(request, payload)
+        return await cached_json_response(request, "training_schedule", "all", load, TRAINING_SCHEDULE_ADAPTER)
     except Exception as e:
         logger.warning(f"Error fetching from MongoDB: {e}. Using fallback data.")
         return FALLBACK_DATA["training_schedule"]
@@ -984,14 +4167,12 @@ async def create_training_schedule(training_data: TrainingScheduleCreate, curren
         "description": training_data.description
     }
     
-    try:
-        if db is None:
-            FALLBACK_DATA["training_schedule"].append(training_doc)
-        else:
-            await db.training_schedule.insert_one(training_doc)
-    except Exception as e:
-        logger.warning(f"Error inserting to MongoDB: {e}. Using fallback.")
+    if db is None:
         FALLBACK_DATA["training_schedule"].append(training_doc)
+    else:
+        # Database outages are answered by the write journal, never absorbed in memory
+        await db.training_schedule.insert_one(training_doc)
+        notify_change("training_schedule")
     
     return TrainingSchedule(**training_doc)
 
@@ -1015,73 +4196,303 @@ async def update_training_schedule(training_id: str, training_data: TrainingSche
     if not update_fields:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    try:
-        if db is None:
-            # Update in fallback
-            for training in FALLBACK_DATA["training_schedule"]:
-                if training["id"] == training_id:
-                    training.update(update_fields)
-                    return TrainingSchedule(**training)
-            raise HTTPException(status_code=404, detail="Training schedule not found")
-        else:
-            result = await db.training_schedule.update_one(
-                {"id": training_id},
-                {"$set": update_fields}
-            )
-            
-            if result.matched_count == 0:
-                raise HTTPException(status_code=404, detail="Training schedule not found")
-            
-            updated_training = await db.training_schedule.find_one({"id": training_id}, {"_id": 0})
-            return TrainingSchedule(**updated_training)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.warning(f"Error updating in MongoDB: {e}. Using fallback.")
+    if db is None:
+        # Update in fallback
         for training in FALLBACK_DATA["training_schedule"]:
             if training["id"] == training_id:
                 training.update(update_fields)
                 return TrainingSchedule(**training)
         raise HTTPException(status_code=404, detail="Training schedule not found")
+    
+    result = await db.training_schedule.update_one(
+        {"id": training_id},
+        {"$set": update_fields}
+    )
+    
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Training schedule not found")
+    notify_change("training_schedule")
+    
+    updated_training = await db.training_schedule.find_one({"id": training_id}, {"_id": 0})
+    return TrainingSchedule(**updated_training)
 
 @api_router.delete("/training-schedule/{training_id}")
 async def delete_training_schedule(training_id: str, current_user: dict = Depends(get_current_referent)):
-    try:
-        if db is None:
-            # Delete from fallback
-            original_len = len(FALLBACK_DATA["training_schedule"])
-            FALLBACK_DATA["training_schedule"] = [t for t in FALLBACK_DATA["training_schedule"] if t["id"] != training_id]
-            if len(FALLBACK_DATA["training_schedule"]) < original_len:
-                return {"message": "Training schedule deleted successfully"}
-            raise HTTPException(status_code=404, detail="Training schedule not found")
-        else:
-            result = await db.training_schedule.delete_one({"id": training_id})
-            
-            if result.deleted_count == 0:
-                raise HTTPException(status_code=404, detail="Training schedule not found")
-            
-            return {"message": "Training schedule deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.warning(f"Error deleting from MongoDB: {e}. Using fallback.")
+    if db is None:
+        # Delete from fallback
         original_len = len(FALLBACK_DATA["training_schedule"])
         FALLBACK_DATA["training_schedule"] = [t for t in FALLBACK_DATA["training_schedule"] if t["id"] != training_id]
         if len(FALLBACK_DATA["training_schedule"]) < original_len:
             return {"message": "Training schedule deleted successfully"}
         raise HTTPException(status_code=404, detail="Training schedule not found")
+    
+    result = await db.training_schedule.delete_one({"id": training_id})
+    
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Training schedule not found")
+    notify_change("training_schedule")
+    
+    return {"message": "Training schedule deleted successfully"}
 
-@api_router.get("/rankings", response_model=List[User])
-async def get_rankings():
-    users = await db.users.find({"est_licencie": True}, {"_id": 0, "password_hash": 0}).sort("points", -1).limit(50).to_list(50)
-    return [User(**user) for user in users]
+leaderboard = Leaderboard()
+_leaderboard_dirty = set()
+_leaderboard_tasks = {}
 
-async def check_and_award_achievements(user_id: str):
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        return
+def mark_leaderboard_dirty(user_id: str):
+    """Queue a member for re-ranking; dirty members are reloaded together in one query"""
+    if read_model is not None and not read_model.is_writer:
+        return  # the writer worker maintains the shared ranking
+    _leaderboard_dirty.add(user_id)
+    task_supervisor.submit_nowait("leaderboard.flush", flush_leaderboard, key="leaderboard.flush")
+
+async def flush_leaderboard():
+    while _leaderboard_dirty:
+        user_ids = list(_leaderboard_dirty)
+        _leaderboard_dirty.clear()
+        generations = {user_id: principal_cache.generation(user_id) for user_id in user_ids}
+        try:
+            users = await db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "password_hash": 0}).to_list(None)
+        except Exception as e:
+            logger.warning(f"Leaderboard refresh failed, waiting for reconciliation: {e}")
+            return
+        found = {user["id"]: user for user in users}
+        for user_id in user_ids:
+            # A newer change re-marked this member: its own flush will apply it
+            if principal_cache.generation(user_id) != generations[user_id]:
+                continue
+            if user_id in found:
+                leaderboard.update(found[user_id])
+            else:
+                leaderboard.remove(user_id)
+    schedule_read_model_publish("rankings")
+
+async def rebuild_leaderboard():
+    users = await db.users.find({"est_licencie": True}, {"_id": 0, "password_hash": 0}).to_list(None)
+    leaderboard.rebuild(users)
+    logger.info(f"Leaderboard rebuilt with {len(leaderboard)} members")
+    schedule_read_model_publish("rankings")
+
+async def reconcile_leaderboard_periodically():
+    while True:
+        await asyncio.sleep(LEADERBOARD_RECONCILE_SECONDS)
+        try:
+            await rebuild_leaderboard()
+        except Exception as e:
+            logger.warning(f"Leaderboard reconciliation failed: {e}")
+        # Like the ranking, the shared payloads are republished even if a change notification was lost
+        schedule_read_model_publish("achievements")
+        schedule_read_model_publish("training_schedule")
+
+# Points history feeding the season and month leaderboards; all-time boards read users.points
+async def record_points_events(events):
+    now = datetime.now(timezone.utc).isoformat()
+    await db.points_events.insert_many([
+        {"user_id": user_id, "delta": delta, "source": source, "date": now}
+        for user_id, delta, source in events
+    ])
+    mark_leaderboards_stale()
+
+def parse_period(period: str):
+    """Resolve "all", "season", "month", "season:2025-2026" or "month:2026-10" to (label, start, end)"""
+    now = datetime.now(timezone.utc)
+    try:
+        kind, _, value = period.partition(":")
+        if kind == "all" and not value:
+            return "all", None, None
+        if kind == "season":
+            # Seasons run from September to August
+            start_year = int(value.split("-")[0]) if value else (now.year if now.month >= 9 else now.year - 1)
+            start = datetime(start_year, 9, 1, tzinfo=timezone.utc)
+            return f"season:{start_year}-{start_year + 1}", start, datetime(start_year + 1, 9, 1, tzinfo=timezone.utc)
+        if kind == "month":
+            month = datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc) if value else now.replace(day=1)
+            start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+            end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc)
+            return f"month:{start:%Y-%m}", start, end
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail="Période invalide")
+
+def parse_existing_period(period: str):
+    """parse_period restricted to periods that have started: no board exists for the future"""
+    label, start, end = parse_period(period)
+    if start is not None and start > datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="Période invalide")
+    return label, start, end
+
+def _leaderboard_ranking_stages(label: str, generation: str) -> List[dict]:
+    """Rank every row per licence type and overall, then upsert them into leaderboards"""
+    return [
+        {"$set": {"board": ["tous", {"$ifNull": ["$type_licence", "autre"]}]}},
+        {"$unwind": "$board"},
+        {"$setWindowFields": {
+            "partitionBy": "$board",
+            "sortBy": {"points": -1},
+            "output": {
+                "rang": {"$rank": {}},
+                "rang_dense": {"$denseRank": {}},
+                "total": {"$count": {}, "window": {"documents": ["unbounded", "unbounded"]}},
+                "meme_score": {"$count": {}, "window": {"range": [0, 0]}}
+            }
+        }},
+        {"$set": {
+            "_id": {"$concat": [label, "|", "$board", "|", "$user_id"]},
+            "period": label,
+            "generation": generation,
+            "ex_aequo": {"$gt": ["$meme_score", 1]},
+            "percentile": {"$cond": [
+                {"$lte": ["$total", 1]},
+                100,
+                {"$round": [{"$multiply": [100, {"$divide": [
+                    {"$subtract": ["$total", "$rang"]}, {"$subtract": ["$total", 1]}
+                ]}]}, 1]}
+            ]}
+        }},
+        {"$unset": "meme_score"},
+        {"$merge": {"into": "leaderboards", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+_leaderboards_lock = asyncio.Lock()
+_stale_periods = set()
+
+async def refresh_period_leaderboard(label: str, start: Optional[datetime], end: Optional[datetime]):
+    """Recompute one period server-side; rows of the previous generation are dropped afterwards"""
+    import uuid
+    generation = str(uuid.uuid4())
+    member_fields = {"nom": "$user.nom", "prenom": "$user.prenom", "type_licence": "$user.type_licence",
+                     "participations": "$user.participations"}
+    if label == "all":
+        source = db.users
+        pipeline = [
+            {"$match": {"est_licencie": True}},
+            {"$project": {"_id": 0, "user_id": "$id", "points": {"$ifNull": ["$points", 0]}, "nom": 1, "prenom": 1,
+                          "type_licence": 1, "participations": 1}}
+        ]
+    else:
+        source = db.points_events
+        pipeline = [
+            {"$match": {"date": {"$gte": start.isoformat(), "$lt": end.isoformat()}}},
+            {"$group": {"_id": "$user_id", "points": {"$sum": "$delta"}}},
+            {"$lookup": {"from": "users", "localField": "_id", "foreignField": "id", "as": "user"}},
+            {"$unwind": "$user"},
+            {"$match": {"user.est_licencie": True}},
+            {"$project": {"_id": 0, "user_id": "$_id", "points": 1, **member_fields}}
+        ]
+    async with _leaderboards_lock:
+        await source.aggregate(pipeline + _leaderboard_ranking_stages(label, generation)).to_list(None)
+        await db.leaderboards.delete_many({"period": label, "generation": {"$ne": generation}})
+        await db.leaderboards_meta.update_one(
+            {"_id": label},
+            {"$set": {"refreshed_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+
+def mark_leaderboards_stale():
+    """Only the open periods can change; they are recomputed together after a short delay"""
+    _stale_periods.update(["all", parse_period("season")[0], parse_period("month")[0]])
+    task_supervisor.submit_nowait("leaderboards.refresh", refresh_stale_leaderboards, key="leaderboards.refresh")
+
+async def refresh_stale_leaderboards():
+    await asyncio.sleep(LEADERBOARD_REFRESH_DELAY)
+    while _stale_periods:
+        labels = list(_stale_periods)
+        _stale_periods.clear()
+        for label in labels:
+            try:
+                await refresh_period_leaderboard(*parse_period(label))
+            except Exception as e:
+                logger.warning(f"Leaderboard {label} refresh failed: {e}")
+
+async def ensure_period_leaderboard(period: str):
+    label, start, end = parse_existing_period(period)
+    meta = await db.leaderboards_meta.find_one({"_id": label})
+    if meta is None:
+        # Closed periods are computed on first read and never change afterwards; periods without
+        # any points history have nothing to rank, so nobody can make the API compute and store them
+        if start is not None and not await db.points_events.find_one(
+            {"date": {"$gte": start.isoformat(), "$lt": end.isoformat()}}, {"_id": 1}
+        ):
+            return label, None
+        await refresh_period_leaderboard(label, start, end)
+        meta = await db.leaderboards_meta.find_one({"_id": label})
+    return label, meta
+
+@api_router.get("/leaderboards")
+async def get_leaderboard(period: str = "all", type_licence: str = "tous",
+                          limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX), offset: int = Query(0, ge=0)):
+    label, meta = await ensure_period_leaderboard(period)
+    rows = await db.leaderboards.find(
+        {"period": label, "board": type_licence},
+        {"_id": 0, "generation": 0}
+    ).sort([("rang", 1), ("user_id", 1)]).skip(offset).limit(limit).to_list(limit)
+    return {
+        "periode": label,
+        "type_licence": type_licence,
+        "actualise_le": meta.get("refreshed_at") if meta else None,
+        "classement": rows
+    }
+
+@api_router.post("/training-schedule/bulk")
+async def bulk_training_schedule(request: BulkRequest, current_user: dict = Depends(get_current_referent)):
+    """Operations: create {TrainingScheduleCreate}, update {TrainingScheduleUpdate}, delete"""
+    import uuid
+    if db is None:
+        raise HTTPException(status_code=503, detail="Base de données indisponible")
+    
+    def build(operation: BulkOperation, training: Optional[dict]):
+        if operation.op == "create":
+            training_doc = {"id": str(uuid.uuid4()), **TrainingScheduleCreate(**operation.data).model_dump()}
+            return InsertOne(training_doc), {"id": training_doc["id"]}
+        if operation.op == "update":
+            update_fields = TrainingScheduleUpdate(**operation.data).model_dump(exclude_none=True)
+            if not update_fields:
+                raise HTTPException(status_code=400, detail="No fields to update")
+            return UpdateOne({"id": operation.id}, {"$set": update_fields}), {"id": operation.id}
+        if operation.op == "delete":
+            return DeleteOne({"id": operation.id}), {"id": operation.id}
+        raise HTTPException(status_code=400, detail=f"Opération inconnue: {operation.op}")
     
-    participations = user.get("participations", 0)
+    results, _ = await run_bulk("training_schedule", request, build)
+    return bulk_summary(results)
+
+@api_router.get("/referent/export/rankings")
+async def export_rankings(period: str = "all", type_licence: str = "tous", format: str = "csv", gzip: bool = False,
+                          current_user: dict = Depends(get_current_referent)):
+    label, _ = await ensure_period_leaderboard(period)
+    cursor = db.leaderboards.find({"period": label, "board": type_licence}, {"_id": 0}).sort([("rang", 1), ("user_id", 1)])
+    columns = ["rang", "rang_dense", "user_id", "nom", "prenom", "type_licence", "points", "participations", "ex_aequo", "percentile"]
+    return export_response(cursor, columns, format, gzip, f"classement_{label.replace(':', '_')}_{type_licence}")
+
+@api_router.get("/rankings", response_model=List[User])
+async def get_rankings(limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX), offset: int = Query(0, ge=0)):
+    page = ranking_page(limit, offset)
+    if page is None:
+        users = await db.users.find({"est_licencie": True}, {"_id": 0, "password_hash": 0}).sort("points", -1).skip(offset).limit(limit).to_list(limit)
+        return fast_json_response(project_user, users)
+    return Response(content=page, media_type="application/json")
+
+@api_router.get("/rankings/me")
+async def get_my_ranking(radius: int = Query(5, ge=0, le=50), current_user: dict = Depends(get_current_principal)):
+    neighbourhood = ranking_neighbourhood(current_user["id"], radius)
+    if neighbourhood is None:
+        raise HTTPException(status_code=503, detail="Classement en cours de calcul")
+    return neighbourhood
+
+@api_router.get("/rankings/around/{user_id}")
+async def get_ranking_around(user_id: str, radius: int = Query(5, ge=0, le=50)):
+    neighbourhood = ranking_neighbourhood(user_id, radius)
+    if neighbourhood is None:
+        raise HTTPException(status_code=503, detail="Classement en cours de calcul")
+    if neighbourhood["rang"] is None:
+        raise HTTPException(status_code=404, detail="Joueur non classé")
+    return neighbourhood
+
+async def check_and_award_achievements(user_id: str, participations: Optional[int] = None):
+    if participations is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "participations": 1})
+        if not user:
+            return
+        participations = user.get("participations", 0)
     
     achievements_to_check = [
         {"id": "membre_fidele", "required": 10},
@@ -1089,31 +4500,39 @@ async def check_and_award_achievements(user_id: str):
         {"id": "veteran", "required": 50}
     ]
     
-    for ach in achievements_to_check:
-        if participations >= ach["required"]:
-            existing = await db.user_achievements.find_one({
-                "user_id": user_id,
-                "achievement_id": ach["id"]
-            })
-            
-            if not existing:
-                achievement = await db.achievements.find_one({"id": ach["id"]}, {"_id": 0})
-                if achievement:
-                    await db.user_achievements.insert_one({
-                        "user_id": user_id,
-                        "achievement_id": ach["id"],
-                        "date_obtenu": datetime.now(timezone.utc).isoformat()
-                    })
-                    
-                    await db.users.update_one(
-                        {"id": user_id},
-                        {"$inc": {"points": achievement["points"]}}
-                    )
+    eligible = [ach["id"] for ach in achievements_to_check if participations >= ach["required"]]
+    if not eligible:
+        return
+    
+    catalog = await db.achievements.find({"id": {"$in": eligible}}, {"_id": 0, "id": 1, "points": 1}).to_list(None)
+    if not catalog:
+        return
+    
+    # Upserts keyed by the unique (user_id, achievement_id) index: an achievement is awarded at most once
+    now = datetime.now(timezone.utc).isoformat()
+    result = await db.user_achievements.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "achievement_id": achievement["id"]},
+            {"$setOnInsert": {"date_obtenu": now}},
+            upsert=True
+        )
+        for achievement in catalog
+    ], ordered=False)
+    
+    awarded = [catalog[index] for index in result.upserted_ids]
+    awarded_points = sum(achievement["points"] for achievement in awarded)
+    if awarded_points:
+        await db.users.update_one(
+            {"id": user_id},
+            {"$inc": {"points": awarded_points}}
+        )
+        await record_points_events([(user_id, achievement["points"], f"achievement:{achievement['id']}") for achievement in awarded])
+        invalidate_user(user_id)
 
 @api_router.post("/test-email")
 async def test_email(email: str):
     """Endpoint de teste para enviar email"""
-    await send_email_async(
+    await email_outbox.enqueue(
         email,
         "🧪 Teste de Email - TCS de Suzini",
         f"""
@@ -1127,99 +4546,30 @@ async def test_email(email: str):
     )
     return {"message": f"Email de teste enviado para {email}"}
 
+@api_router.get("/referent/journal/conflicts")
+async def get_journal_conflicts(current_user: dict = Depends(get_current_referent)):
+    """Writes accepted during a database outage that could not be applied on replay"""
+    return await db.journal_entries.find({"status": "conflict"}, {"_id": 0}).sort("at", -1).to_list(100)
+
+@api_router.get("/referent/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_referent)):
+    return {
+        "database": database_breaker.stats(),
+        "write_journal": write_journal.stats(),
+        "password_hasher": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "domain_cache": domain_cache.stats(),
+        "email_outbox": email_outbox.stats(),
+        "background_tasks": task_supervisor.stats(),
+        "live_streams": event_hub.stats(),
+        "invalidation_bus": invalidation_bus.stats(),
+        "read_model": read_model.stats() if read_model is not None else None,
+        "indexes": index_report
+    }
+
 @api_router.post("/seed-data")
 async def seed_data():
-    achievements_count = await db.achievements.count_documents({})
-    if achievements_count == 0:
-        achievements = [
-            {
-                "id": "membre_fidele",
-                "nom": "Membre Fidèle",
-                "description": "Participer à 10 événements du club",
-                "icone": "🏐",
-                "points": 100
-            },
-            {
-                "id": "toujours_present",
-                "nom": "Toujours Présent",
-                "description": "Participer à 20 événements du club",
-                "icone": "⭐",
-                "points": 250
-            },
-            {
-                "id": "veteran",
-                "nom": "Vétéran",
-                "description": "Participer à 50 événements du club",
-                "icone": "👑",
-                "points": 500
-            },
-            {
-                "id": "premier_tournoi",
-                "nom": "Premier Tournoi",
-                "description": "S'inscrire à son premier tournoi",
-                "icone": "🎯",
-                "points": 50
-            },
-            {
-                "id": "champion",
-                "nom": "Champion du Club",
-                "description": "Gagner 3 tournois",
-                "icone": "🏆",
-                "points": 1000
-            }
-        ]
-        await db.achievements.insert_many(achievements)
-    
-    training_count = await db.training_schedule.count_documents({})
-    if training_count == 0:
-        schedules = [
-            {
-                "id": "lundi_entrainement",
-                "jour": "Lundi",
-                "heure_debut": "18:00",
-                "heure_fin": "20:00",
-                "type": "Entraînement",
-                "licence_requise": "competition",
-                "description": "Entraînement dirigé pour les licenciés Compétition"
-            },
-            {
-                "id": "lundi_jeu_libre",
-                "jour": "Lundi",
-                "heure_debut": "20:00",
-                "heure_fin": "22:00",
-                "type": "Jeu Libre",
-                "licence_requise": "tous",
-                "description": "Jeu libre ouvert à tous les licenciés"
-            },
-            {
-                "id": "mercredi_entrainement",
-                "jour": "Mercredi",
-                "heure_debut": "18:00",
-                "heure_fin": "20:00",
-                "type": "Entraînement",
-                "licence_requise": "competition",
-                "description": "Entraînement dirigé pour les licenciés Compétition"
-            },
-            {
-                "id": "mercredi_jeu_libre",
-                "jour": "Mercredi",
-                "heure_debut": "20:00",
-                "heure_fin": "22:00",
-                "type": "Jeu Libre",
-                "licence_requise": "tous",
-                "description": "Jeu libre ouvert à tous les licenciés"
-            },
-            {
-                "id": "vendredi_jeu_libre",
-                "jour": "Vendredi",
-                "heure_debut": "18:00",
-                "heure_fin": "22:00",
-                "type": "Jeu Libre",
-                "licence_requise": "tous",
-                "description": "Jeu libre ouvert à tous les licenciés"
-            }
-        ]
-        await db.training_schedule.insert_many(schedules)
+    await run_migrations()
     
     referent_exists = await db.users.find_one({"role": "referent"})
     if not referent_exists:
@@ -1228,7 +4578,7 @@ async def seed_data():
         referent_doc = {
             "id": referent_id,
             "email": "referent@tcssuzini.fr",
-            "password_hash": pwd_context.hash("referent123"),
+            "password_hash": await password_hasher.hash("referent123"),
             "nom": "Référent",
             "prenom": "Directeur",
             "type_licence": "competition",
@@ -1247,7 +4597,7 @@ async def seed_data():
         admin_doc = {
             "id": admin_id,
             "email": "admin@tcssuzini.fr",
-            "password_hash": pwd_context.hash("admin123"),
+            "password_hash": await password_hasher.hash("admin123"),
             "nom": "Admin",
             "prenom": "TCS",
             "type_licence": "competition",
@@ -1263,6 +4613,7 @@ async def seed_data():
 
 app.include_router(api_router)
 
+app.add_middleware(WriteJournalMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1275,7 +4626,17 @@ app.add_middleware(
     ] if os.environ.get('CORS_ORIGINS') is None else os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Data-Stale"],
 )
+app.add_middleware(DatabaseOutageMiddleware)
+
+@app.exception_handler(ConnectionFailure)
+async def database_unavailable_handler(request: Request, exc: ConnectionFailure):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Base de données momentanément indisponible"},
+        headers={"Retry-After": str(max(1, round(database_breaker.retry_after())))}
+    )
 
 logging.basicConfig(
     level=logging.INFO,
@@ -1283,106 +4644,77 @@ logging.basicConfig(
 )
 
 @app.on_event("startup")
-async def startup_db_seed():
-    """Initialize database with seed data on startup"""
+async def start_database_breaker():
+    database_breaker.start()
+
+@app.on_event("startup")
+async def start_write_journal():
+    write_journal.start()
+
+@app.on_event("startup")
+async def startup_migrations():
+    """Apply pending migrations and index changes; a single lookup when up to date"""
     try:
-        achievements_count = await db.achievements.count_documents({})
-        if achievements_count == 0:
-            achievements = [
-                {
-                    "id": "membre_fidele",
-                    "nom": "Membre Fidèle",
-                    "description": "Participer à 10 événements du club",
-                    "icone": "🏐",
-                    "points": 100
-                },
-                {
-                    "id": "toujours_present",
-                    "nom": "Toujours Présent",
-                    "description": "Participer à 20 événements du club",
-                    "icone": "⭐",
-                    "points": 250
-                },
-                {
-                    "id": "veteran",
-                    "nom": "Vétéran",
-                    "description": "Participer à 50 événements du club",
-                    "icone": "👑",
-                    "points": 500
-                },
-                {
-                    "id": "premier_tournoi",
-                    "nom": "Premier Tournoi",
-                    "description": "S'inscrire à son premier tournoi",
-                    "icone": "🎯",
-                    "points": 50
-                },
-                {
-                    "id": "champion",
-                    "nom": "Champion du Club",
-                    "description": "Gagner 3 tournois",
-                    "icone": "🏆",
-                    "points": 1000
-                }
-            ]
-            await db.achievements.insert_many(achievements)
-        
-        training_count = await db.training_schedule.count_documents({})
-        if training_count == 0:
-            schedules = [
-                {
-                    "id": "lundi_entrainement",
-                    "jour": "Lundi",
-                    "heure_debut": "18:00",
-                    "heure_fin": "20:00",
-                    "type": "Entraînement",
-                    "licence_requise": "competition",
-                    "description": "Entraînement dirigé pour les licenciés Compétition"
-                },
-                {
-                    "id": "lundi_jeu_livre",
-                    "jour": "Lundi",
-                    "heure_debut": "20:00",
-                    "heure_fin": "22:00",
-                    "type": "Jeu Libre",
-                    "licence_requise": "tous",
-                    "description": "Jeu libre ouvert à tous les licenciés"
-                },
-                {
-                    "id": "mercredi_entrainement",
-                    "jour": "Mercredi",
-                    "heure_debut": "18:00",
-                    "heure_fin": "20:00",
-                    "type": "Entraînement",
-                    "licence_requise": "competition",
-                    "description": "Entraînement dirigé pour les licenciés Compétition"
-                },
-                {
-                    "id": "mercredi_jeu_livre",
-                    "jour": "Mercredi",
-                    "heure_debut": "20:00",
-                    "heure_fin": "22:00",
-                    "type": "Jeu Libre",
-                    "licence_requise": "tous",
-                    "description": "Jeu libre ouvert à tous les licenciés"
-                },
-                {
-                    "id": "vendredi_jeu_livre",
-                    "jour": "Vendredi",
-                    "heure_debut": "18:00",
-                    "heure_fin": "22:00",
-                    "type": "Jeu Livre",
-                    "licence_requise": "tous",
-                    "description": "Jeu libre ouvert à tous les licenciés"
-                }
-            ]
-            await db.training_schedule.insert_many(schedules)
-        
-        logger.info("✓ Database seed completed successfully")
+        await run_migrations()
     except Exception as e:
-        logger.error(f"Error during startup seed: {e}")
+        logger.error(f"Error during startup migrations: {e}")
+
+@app.on_event("startup")
+async def start_password_hasher():
+    password_hasher.start()
+
+@app.on_event("startup")
+async def start_email_outbox():
+    email_outbox.start()
+
+@app.on_event("startup")
+async def start_task_supervisor():
+    task_supervisor.start()
+
+@app.on_event("startup")
+async def start_invalidation_bus():
+    try:
+        invalidation_bus.start()
+    except OSError as e:
+        logger.error(f"Invalidation bus unavailable, caches are local to this worker: {e}")
+
+@app.on_event("startup")
+async def start_leaderboard():
+    if read_model is not None:
+        read_model.start()
+        if not read_model.is_writer:
+            # Readers serve the shared model and take over if the writer goes away
+            _leaderboard_tasks["takeover"] = asyncio.create_task(take_over_read_model())
+            return
+    await start_leaderboard_writer()
+
+async def start_leaderboard_writer():
+    try:
+        await rebuild_leaderboard()
+    except Exception as e:
+        logger.error(f"Error during leaderboard build: {e}")
+    mark_leaderboards_stale()
+    schedule_read_model_publish("achievements")
+    schedule_read_model_publish("training_schedule")
+    _leaderboard_tasks["reconcile"] = asyncio.create_task(reconcile_leaderboard_periodically())
+
+async def take_over_read_model():
+    while not read_model.try_become_writer():
+        await asyncio.sleep(READ_MODEL_TAKEOVER_SECONDS)
+    await start_leaderboard_writer()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Background jobs may still hash, write or queue emails: drain them first
+    await task_supervisor.drain(TASK_DRAIN_SECONDS)
+    await invalidation_bus.stop()
+    if read_model is not None:
+        read_model.close()
+    await password_hasher.stop()
+    await email_outbox.stop()
+    for task in _leaderboard_tasks.values():
+        task.cancel()
+    await write_journal.stop()
+    await database_breaker.stop()
     if client is not None:
         client.close()
@@ -41,6 +41,38 @@ function App() {
     initializeData();
   }, []);
 
+  // Os access tokens expiram em minutos: renovar com o refresh token e repetir a requisição
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (
+          error.response?.status !== 401 ||
+          !refreshToken ||
+          !original ||
+          original._retry ||
+          original.url?.endsWith('/auth/refresh')
+        ) {
+          return Promise.reject(error);
+        }
+        original._retry = true;
+        try {
+          const response = await axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken });
+          localStorage.setItem('token', response.data.token);
+          localStorage.setItem('refresh_token', response.data.refresh_token);
+          setToken(response.data.token);
+          original.headers = { ...original.headers, Authorization: `Bearer ${response.data.token}` };
+          return axios(original);
+        } catch (refreshError) {
+          return Promise.reject(error);
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   useEffect(() => {
     const fetchUser = async () => {
       if (token) {
@@ -67,14 +99,20 @@ function App() {
     fetchUser();
   }, [token]);
 
-  const login = (newToken, userData) => {
+  const login = (newToken, userData, refreshToken) => {
     localStorage.setItem('token', newToken);
+    if (refreshToken) {
+      localStorage.setItem('refresh_token', refreshToken);
+    } else {
+      localStorage.removeItem('refresh_token');
+    }
     setToken(newToken);
     setUser(userData);
   };
 
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setToken(null);
     setUser(null);
   };
@@ -31,22 +31,19 @@ export default function Dashboard() {
           return;
         }
 
-        // Para usuários normais, usar dados mockados também para não quebrar se API não responder
+        // Um único pedido: perfil, torneios, partidas e classificação
+        const response = await axios.get(`${API}/dashboard`, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        const data = response.data;
         setStats({
-          tournaments: 3,
-          upcomingMatches: 2,
-          userRank: 1250,
-          achievements: 5
+          tournaments: data.tournois_actifs.total,
+          upcomingMatches: data.prochains_matchs.total,
+          userRank: data.classement.points,
+          achievements: data.profil.achievements.length
         });
       } catch (error) {
         console.error('Error fetching dashboard data:', error);
-        // Mesmo com erro, mostrar dados mockados
-        setStats({
-          tournaments: 3,
-          upcomingMatches: 2,
-          userRank: 1250,
-          achievements: 5
-        });
       }
     };
     fetchDashboardData();
@@ -50,7 +50,7 @@ export default function Login() {
     setIsLoading(true);
     try {
       const response = await axios.post(`${API}/auth/login`, loginData);
-      login(response.data.token, response.data.user);
+      login(response.data.token, response.data.user, response.data.refresh_token);
       toast.success('Connexion réussie!');
       // Esperar o estado atualizar completamente antes de navegar
       setTimeout(() => navigate('/'), 500);
@@ -87,7 +87,7 @@ export default function Login() {
     setIsLoading(true);
     try {
       const response = await axios.post(`${API}/auth/register`, registerData);
-      login(response.data.token, response.data.user);
+      login(response.data.token, response.data.user, response.data.refresh_token);
       toast.success('Inscription réussie!');
       setTimeout(() => navigate('/'), 500);
     } catch (error) {
@@ -127,7 +127,7 @@ export default function Login() {
         email: referentEmail,
         code_verification: verificationCode
       });
-      login(response.data.token, response.data.user);
+      login(response.data.token, response.data.user, response.data.refresh_token);
       toast.success('Compte référent créé avec succès!');
       setShowReferentVerification(false);
       setTimeout(() => navigate('/'), 200);
@@ -31,6 +31,16 @@ export default function Matches() {
     fetchMatches();
   }, [token]);
 
+  // Placar ao vivo: o servidor envia cada atualização de placar
+  useEffect(() => {
+    const source = new EventSource(`${API}/matches/live`);
+    source.addEventListener('score', (event) => {
+      const updated = JSON.parse(event.data);
+      setMatches((current) => current.map((match) => (match.id === updated.id ? { ...match, ...updated } : match)));
+    });
+    return () => source.close();
+  }, []);
+
   if (loading) {
     return (
       <div className="min-h-screen flex flex-col relative" style={{ background: '#1a1f2e' }}>
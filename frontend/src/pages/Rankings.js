@@ -12,14 +12,18 @@ export default function Rankings() {
   const { token, user } = useContext(AuthContext);
   const [rankings, setRankings] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [period, setPeriod] = useState('all');
+  const [typeLicence, setTypeLicence] = useState('tous');
 
   useEffect(() => {
     const fetchRankings = async () => {
       try {
-        const response = await axios.get(`${API}/rankings`, {
+        // Classements précalculés côté serveur (collection leaderboards)
+        const response = await axios.get(`${API}/leaderboards`, {
+          params: { period, type_licence: typeLicence },
           headers: { Authorization: `Bearer ${token}` }
         });
-        setRankings(response.data);
+        setRankings(response.data.classement);
       } catch (error) {
         console.error('Error fetching rankings:', error);
         toast.error('Erreur lors du chargement du classement');
@@ -29,7 +33,7 @@ export default function Rankings() {
     };
 
     fetchRankings();
-  }, [token]);
+  }, [token, period, typeLicence]);
 
   if (loading) {
     return (
@@ -54,6 +58,28 @@ export default function Rankings() {
             📊 Classement
           </h1>
           <p className="text-lg text-gray-400 mt-2">Les meilleurs membres du club</p>
+          <div className="flex flex-wrap gap-3 mt-4">
+            <select
+              data-testid="rankings-period-select"
+              value={period}
+              onChange={(e) => setPeriod(e.target.value)}
+              className="px-3 py-2 rounded-md bg-[#252b3d] border border-gray-700 text-white"
+            >
+              <option value="all">Général</option>
+              <option value="season">Saison en cours</option>
+              <option value="month">Ce mois-ci</option>
+            </select>
+            <select
+              data-testid="rankings-licence-select"
+              value={typeLicence}
+              onChange={(e) => setTypeLicence(e.target.value)}
+              className="px-3 py-2 rounded-md bg-[#252b3d] border border-gray-700 text-white"
+            >
+              <option value="tous">Toutes licences</option>
+              <option value="competition">Compétition</option>
+              <option value="jeu_libre">Jeu Libre</option>
+            </select>
+          </div>
         </div>
 
         {rankings.length === 0 ? (
@@ -68,7 +94,7 @@ export default function Rankings() {
             {rankings.slice(0, 3).length > 0 && (
               <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-8">
                 {rankings.slice(0, 3).map((player, index) => (
-                  <Card key={player.id} className="glass-card border-0" data-testid={`podium-${index + 1}`}>
+                  <Card key={player.user_id} className="glass-card border-0" data-testid={`podium-${index + 1}`}>
                     <CardHeader className="text-center">
                       <div className="flex justify-center mb-4">
                         <div className={`w-20 h-20 rounded-full ${
@@ -76,7 +102,7 @@ export default function Rankings() {
                           index === 1 ? 'bg-gradient-to-br from-[#C0C0C0] to-[#808080]' : 
                           'bg-gradient-to-br from-[#CD7F32] to-[#8B4513]'
                         } flex items-center justify-center shadow-lg`}>
-                          <span className="text-3xl font-anton text-white">{index + 1}</span>
+                          <span className="text-3xl font-anton text-white">{player.rang}</span>
                         </div>
                       </div>
                       <CardTitle className="text-xl text-white">{player.prenom} {player.nom}</CardTitle>
@@ -99,22 +125,25 @@ export default function Rankings() {
                 <div className="space-y-2">
                   {rankings.map((player, index) => (
                     <div
-                      key={player.id}
+                      key={player.user_id}
                       className={`p-4 rounded-xl flex items-center justify-between ${
-                        player.id === user?.id ? 'bg-[#FF6B35]/20 border-2 border-[#FF6B35]' : 'glass-card border-0'
+                        player.user_id === user?.id ? 'bg-[#FF6B35]/20 border-2 border-[#FF6B35]' : 'glass-card border-0'
                       } hover:bg-white/10 transition-colors`}
                       data-testid={`ranking-row-${index}`}
                     >
                       <div className="flex items-center space-x-4 flex-1">
                         <div className="w-10 h-10 bg-gradient-to-br from-[#FF6B35] to-[#10B981] rounded-full flex items-center justify-center shadow-lg">
-                          <span className="text-white font-bold">{index + 1}</span>
+                          <span className="text-white font-bold">{player.rang}</span>
                         </div>
                         <div>
                           <p className="font-bold text-white">
                             {player.prenom} {player.nom}
-                            {player.id === user?.id && <span className="ml-2 text-sm text-[#FF6B35]">(Vous)</span>}
+                            {player.user_id === user?.id && <span className="ml-2 text-sm text-[#FF6B35]">(Vous)</span>}
+                            {player.ex_aequo && <span className="ml-2 text-xs text-gray-400">ex æquo</span>}
+                          </p>
+                          <p className="text-sm text-gray-400">
+                            🎯 {player.participations} participations · top {Math.max(1, Math.round(100 - player.percentile))}%
                           </p>
-                          <p className="text-sm text-gray-400">🎯 {player.participations} participations</p>
                         </div>
                       </div>
                       <div className="flex items-center space-x-2">
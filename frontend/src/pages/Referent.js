@@ -37,11 +37,19 @@ export default function Referent() {
 
   const fetchUsers = async () => {
     try {
-      const response = await axios.get(`${API}/referent/users`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setUsers(response.data);
-      setFilteredUsers(response.data);
+      // A lista é paginada: segue o X-Next-Cursor até a última página
+      const allUsers = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/referent/users`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { limit: 500, ...(cursor ? { cursor } : {}) }
+        });
+        allUsers.push(...response.data);
+        cursor = response.headers['x-next-cursor'] || null;
+      } while (cursor);
+      setUsers(allUsers);
+      setFilteredUsers(allUsers);
     } catch (error) {
       console.error('Error fetching users:', error);
       toast.error('Erreur lors du chargement des utilisateurs');
@@ -62,6 +70,33 @@ export default function Referent() {
     }
   };
 
+  // Início de temporada: uma única requisição para todos os membros filtrados
+  const handleBulkLicense = async (estLicencie) => {
+    const targets = filteredUsers.filter(u => u.role !== 'referent' && u.est_licencie !== estLicencie);
+    if (targets.length === 0) {
+      return;
+    }
+    if (!window.confirm(`Modifier la licence de ${targets.length} membre(s)?`)) {
+      return;
+    }
+    try {
+      const response = await axios.post(`${API}/referent/users/bulk`, {
+        ordered: false,
+        operations: targets.map(u => ({ op: 'set_license', id: u.id, data: { est_licencie: estLicencie } }))
+      }, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      if (response.data.echecs > 0) {
+        toast.error(`${response.data.echecs} modification(s) en échec`);
+      } else {
+        toast.success(`${response.data.succes} licence(s) modifiée(s)`);
+      }
+      fetchUsers();
+    } catch (error) {
+      toast.error('Erreur lors de la modification');
+    }
+  };
+
   const handleDeleteUser = async (userId) => {
     if (!window.confirm('Êtes-vous sûr de vouloir supprimer cet utilisateur?')) {
       return;
@@ -159,6 +194,14 @@ export default function Referent() {
           <CardHeader>
             <div className="flex items-center justify-between">
               <CardTitle className="text-2xl font-anton uppercase text-white">Liste des Membres</CardTitle>
+              <div className="flex items-center space-x-2">
+                <Button size="sm" variant="outline" onClick={() => handleBulkLicense(true)} data-testid="bulk-validate-licenses">
+                  Tout valider
+                </Button>
+                <Button size="sm" variant="outline" onClick={() => handleBulkLicense(false)} data-testid="bulk-revoke-licenses">
+                  Tout révoquer
+                </Button>
+              </div>
               <div className="relative">
                 <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 w-4 h-4 text-gray-400" />
                 <Input
@@ -0,0 +1,19 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017"))
+os.environ.setdefault("DB_NAME", "tcs_test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def task_supervisor(monkeypatch):
+    """A fresh background-task supervisor, so no test leaves jobs or a drained supervisor behind"""
+    supervisor = server.TaskSupervisor(server.TASK_CONCURRENCY, server.TASK_QUEUE_SIZE)
+    monkeypatch.setattr(server, "task_supervisor", supervisor)
+    return supervisor
@@ -0,0 +1,96 @@
+"""The outbox delivers through a real SMTP server and stops calling it once it keeps failing.
+
+Runs against an aiosmtpd server on localhost and a mongomock-motor database.
+"""
+import asyncio
+import socket
+
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, smtp_server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    port = free_port()
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["tcs_test"])
+    monkeypatch.setattr(server, "RESEND_API_KEY", "")
+    monkeypatch.setattr(server, "SMTP_ENABLED", True)
+    monkeypatch.setattr(server, "SMTP_AUTH", "none")
+    monkeypatch.setattr(server, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(server, "SMTP_PORT", port)
+    monkeypatch.setattr(server, "SMTP_EMAIL", "club@example.com")
+    monkeypatch.setattr(server, "SMTP_STARTTLS", False)
+    return server.EmailOutbox(1), port
+
+
+async def deliver_next(email_outbox):
+    message = await server.db.email_outbox.find_one({"status": "pending"}, {"_id": 0})
+    await email_outbox._deliver(message)
+    return await server.db.email_outbox.find_one({"id": message["id"]}, {"_id": 0})
+
+
+def test_messages_are_delivered_over_smtp_and_bodies_dropped(outbox):
+    email_outbox, port = outbox
+    inbox = Inbox()
+    smtp = controller.Controller(inbox, hostname="127.0.0.1", port=port)
+    smtp.start()
+
+    async def run():
+        await email_outbox.enqueue("membre@example.com", "Réinitialisation", "<p>code 123456</p>")
+        await email_outbox.enqueue("autre@example.com", "Bienvenue", "<p>bonjour</p>")
+        first = await deliver_next(email_outbox)
+        second = await deliver_next(email_outbox)
+        await email_outbox.stop()
+        return first, second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        smtp.stop()
+    assert [envelope.rcpt_tos for envelope in inbox.messages] == [["membre@example.com"], ["autre@example.com"]]
+    assert b"code 123456" in inbox.messages[0].content
+    for message in (first, second):
+        assert message["status"] == "sent" and message["provider"] == "smtp"
+        assert "html" not in message
+    # The second message reused the first connection
+    assert email_outbox.stats()["smtp_connections_opened"] == 1
+
+
+def test_breaker_opens_after_repeated_smtp_failures(outbox):
+    email_outbox, _ = outbox  # nothing listens on the port
+
+    async def run():
+        await email_outbox.enqueue("membre@example.com", "Réinitialisation", "<p>code</p>")
+        attempts = []
+        for _ in range(server.EMAIL_BREAKER_FAILURES + 1):
+            message = await deliver_next(email_outbox)
+            attempts.append(message)
+        return attempts
+
+    attempts = asyncio.run(run())
+    breaker = email_outbox.breakers["smtp"]
+    assert breaker.state == "open" and breaker.trips == 1
+    assert all(attempt["status"] == "pending" for attempt in attempts)
+    assert attempts[-1]["last_error"] == "smtp: circuit ouvert"
+    assert attempts[-1]["attempts"] == server.EMAIL_BREAKER_FAILURES + 1
+    # Retries wait at least until the breaker lets a probe through
+    assert attempts[-1]["next_attempt_at"] - server.time.time() > server.EMAIL_BREAKER_RESET_SECONDS - 5
@@ -0,0 +1,92 @@
+"""Concurrent tournament registration must never over-book a tournament.
+
+The race only exists against a real server: set TEST_MONGO_URL to a mongod
+(a throwaway database is created and dropped) or the test is skipped.
+mongomock-motor answers every call without yielding, so the registrations
+never interleave there; it only runs as a smoke test of the endpoint.
+
+    TEST_MONGO_URL=mongodb://localhost:27017 pytest tests/test_tournament_registration.py
+"""
+import asyncio
+import os
+import uuid
+
+import httpx
+import pytest
+
+import server
+
+PLAYERS = 500
+MAX_PARTICIPANTS = 16
+
+
+async def register_concurrently(database, players_count: int):
+    tournament_id = str(uuid.uuid4())
+    await database.tournaments.insert_one({
+        "id": tournament_id,
+        "nom": "Tournoi de test",
+        "participants": [],
+        "max_participants": MAX_PARTICIPANTS,
+    })
+    players = [{
+        "id": str(uuid.uuid4()),
+        "email": f"joueur{i}@example.com",
+        "nom": f"Nom{i}",
+        "prenom": f"Prénom{i}",
+        "type_licence": "competition",
+        "est_licencie": True,
+        "role": "user",
+        "points": 0,
+        "participations": 0,
+    } for i in range(players_count)]
+    await database.users.insert_many([dict(player) for player in players])
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def register(player):
+            token = server.create_user_tokens(player)["token"]
+            return await client.post(f"/api/tournaments/{tournament_id}/register",
+                                     headers={"Authorization": f"Bearer {token}"})
+
+        responses = await asyncio.gather(*(register(player) for player in players))
+
+    await server.task_supervisor.drain(5)
+    tournament = await database.tournaments.find_one({"id": tournament_id}, {"_id": 0})
+    return responses, tournament
+
+
+def assert_never_overbooked(responses, tournament):
+    accepted = [response for response in responses if response.status_code == 200]
+    rejected = [response for response in responses if response.status_code != 200]
+    assert len(accepted) == MAX_PARTICIPANTS
+    assert all(response.status_code == 400 and response.json()["detail"] == "Le tournoi est complet"
+               for response in rejected)
+    assert len(tournament["participants"]) == MAX_PARTICIPANTS
+    assert len(set(tournament["participants"])) == MAX_PARTICIPANTS
+
+
+def test_concurrent_registrations_never_exceed_max_participants(monkeypatch, task_supervisor):
+    url = os.environ.get("TEST_MONGO_URL")
+    if not url:
+        pytest.skip("TEST_MONGO_URL not set: the registration race needs a real mongod")
+
+    async def run():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=3000)
+        database = client[f"tcs_test_{uuid.uuid4().hex[:8]}"]
+        monkeypatch.setattr(server, "db", database)
+        try:
+            return await register_concurrently(database, PLAYERS)
+        finally:
+            await client.drop_database(database.name)
+            client.close()
+
+    assert_never_overbooked(*asyncio.run(run()))
+
+
+def test_registration_smoke_mongomock(monkeypatch, task_supervisor):
+    """Smoke test only: mongomock does not interleave the registrations"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["tcs_test"]
+    monkeypatch.setattr(server, "db", database)
+    assert_never_overbooked(*asyncio.run(register_concurrently(database, 2 * MAX_PARTICIPANTS)))
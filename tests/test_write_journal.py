@@ -0,0 +1,137 @@
+"""Writes journaled while MongoDB is down are replayed once, in order, with conflicts recorded.
+
+Runs on mongomock-motor: replay is sequential, so no real server is needed.
+"""
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+REFERENT = {"id": "referent-1", "email": "ref@example.com", "nom": "Ref", "prenom": "Un",
+            "type_licence": "competition", "est_licencie": True, "role": "referent"}
+DEMOTED = {"id": "referent-2", "email": "ref2@example.com", "nom": "Ref", "prenom": "Deux",
+           "type_licence": "competition", "est_licencie": True, "role": "referent"}
+SLOT = {"jour": "Lundi", "heure_debut": "18:00", "heure_fin": "20:00", "type": "Entraînement",
+        "licence_requise": "competition", "description": "Journal"}
+
+
+@pytest.fixture
+def journal(monkeypatch, tmp_path, task_supervisor):
+    database = mongomock_motor.AsyncMongoMockClient()["tcs_test"]
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "MONGO_BREAKER_PROBE_SECONDS", 3600)  # replays are run by the test
+    monkeypatch.setattr(server, "database_breaker", server.DatabaseBreaker("MongoDB", 3, 3600))
+    write_journal = server.WriteJournal(str(tmp_path / "journal.jsonl"), 0.01, 1024 * 1024)
+    monkeypatch.setattr(server, "write_journal", write_journal)
+    return database, write_journal
+
+
+def headers(user):
+    return {"Authorization": f"Bearer {server.create_user_tokens(user)['token']}"}
+
+
+async def journal_during_outage(database, write_journal):
+    await database.journal_entries.create_index("id", unique=True)
+    await database.users.insert_many([dict(REFERENT), dict(DEMOTED)])
+    await database.training_schedule.insert_one({"id": "slot-1", **SLOT})
+    write_journal.start()
+    server.database_breaker.state = "open"
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        created = await asyncio.gather(*(
+            client.post("/api/training-schedule", json={**SLOT, "description": f"Créneau {i}"}, headers=headers(REFERENT))
+            for i in range(10)
+        ))
+        deleted = await client.delete("/api/training-schedule/slot-1", headers=headers(REFERENT))
+        updated = await client.put("/api/training-schedule/slot-1", json={"jour": "Mardi"}, headers=headers(REFERENT))
+        demoted = await client.post("/api/training-schedule", json=SLOT, headers=headers(DEMOTED))
+        anonymous = await client.post("/api/training-schedule", json=SLOT)
+    return created, deleted, updated, demoted, anonymous
+
+
+def test_outage_writes_are_journaled_then_replayed_once(journal):
+    database, write_journal = journal
+
+    async def run():
+        created, deleted, updated, demoted, anonymous = await journal_during_outage(database, write_journal)
+        assert all(response.status_code == 202 for response in [*created, deleted, updated, demoted])
+        assert anonymous.status_code == 403
+        # The ten concurrent writes shared fsyncs instead of paying one each
+        assert write_journal.stats()["fsyncs"] < 10 + 3
+        assert await database.training_schedule.count_documents({}) == 1
+        journaled = open(write_journal.path, "rb").read()
+
+        await database.users.update_one({"id": DEMOTED["id"]}, {"$set": {"role": "user"}})
+        server.database_breaker.record_success()
+        await write_journal.replay()
+        assert not write_journal.pending()
+
+        # Replaying the same lines again applies nothing twice
+        write_journal._write(journaled)
+        await write_journal.replay()
+        await write_journal.stop()
+
+        slots = await database.training_schedule.find({}, {"_id": 0}).to_list(None)
+        entries = await database.journal_entries.find({}, {"_id": 0}).to_list(None)
+        return journaled, slots, entries
+
+    journaled, slots, entries = asyncio.run(run())
+    assert len(journaled.splitlines()) == 13
+    assert sorted(slot["description"] for slot in slots) == sorted(f"Créneau {i}" for i in range(10))
+    assert len(entries) == 13
+    conflicts = {entry["method"]: entry["reason"] for entry in entries if entry["status"] == "conflict"}
+    # In order: the update of slot-1 ran after its deletion
+    assert conflicts == {"PUT": "Training schedule not found", "POST": "Rôle modifié depuis l'enregistrement"}
+    assert sum(entry["status"] == "applied" for entry in entries) == 11
+
+
+def test_unreadable_lines_are_set_aside(journal):
+    database, write_journal = journal
+    entry = {"id": "entry-1", "at": 0, "method": "DELETE", "path": "/api/training-schedule/missing", "query": "",
+             "headers": [], "body": "", "principal": {"id": REFERENT["id"], "role": "referent", "est_licencie": True}}
+
+    async def run():
+        await database.journal_entries.create_index("id", unique=True)
+        await database.users.insert_one(dict(REFERENT))
+        write_journal._write(b"not json\n" + json.dumps(entry).encode() + b"\n" + b'{"id": "torn"')
+        await write_journal.replay()
+
+    asyncio.run(run())
+    assert not write_journal.pending()
+    assert open(write_journal.conflicts_path, "rb").read().splitlines() == [b"not json", b'{"id": "torn"']
+    assert write_journal.stats()["conflicts"] == 1
+
+
+def test_server_errors_are_retried_not_recorded_as_conflicts(journal, monkeypatch):
+    database, write_journal = journal
+    entry = {"id": "entry-1", "at": 0, "method": "POST", "path": "/api/training-schedule", "query": "",
+             "headers": [["content-type", "application/json"]],
+             "body": base64.b64encode(json.dumps(SLOT).encode()).decode(),
+             "principal": {"id": REFERENT["id"], "role": "referent", "est_licencie": True}}
+    call_app = server.call_app
+
+    async def unavailable(*args, **kwargs):
+        return 503, {}, b'{"detail": "Base de donn\\u00e9es momentan\\u00e9ment indisponible"}'
+
+    async def run():
+        await database.journal_entries.create_index("id", unique=True)
+        await database.users.insert_one(dict(REFERENT))
+        write_journal._write(json.dumps(entry).encode() + b"\n")
+        monkeypatch.setattr(server, "call_app", unavailable)
+        with pytest.raises(server.ReplayPaused):
+            await write_journal.replay()
+        assert write_journal.pending()
+        monkeypatch.setattr(server, "call_app", call_app)
+        await write_journal.replay()
+        return await database.journal_entries.find_one({"id": "entry-1"}, {"_id": 0})
+
+    marker = asyncio.run(run())
+    assert marker["status"] == "applied"
+    assert not write_journal.pending()